@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, create_engine
+
+from benchmark.common import measure
+from domain import chat, user, user_session, image, friend_relation  # noqa: F401
+from domain.chat_room import ChatRoom
+from repository import chat_repository
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE textchat (id INTEGER PRIMARY KEY, chatroom_id INTEGER, writer_id INTEGER, time VARCHAR, "
+    "text VARCHAR)",
+    "CREATE TABLE imagechat (id INTEGER PRIMARY KEY, chatroom_id INTEGER, writer_id INTEGER, time VARCHAR, "
+    "image_id INTEGER)",
+]
+
+
+def seed(engine, messages: int, rooms: int, image_ratio: float):
+    start = datetime(2023, 1, 1)
+    texts, images, chats = [], [], []
+    for i in range(messages):
+        chatroom_id = random.randrange(rooms) + 1
+        t = (start + timedelta(seconds=i)).isoformat()
+        if random.random() < image_ratio:
+            images.append((chatroom_id, 1, t, 1))
+            chats.append((chatroom_id, 1, t, None, 1))
+        else:
+            texts.append((chatroom_id, 1, t, f"message {i}"))
+            chats.append((chatroom_id, 1, t, f"message {i}", None))
+
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (id, name, login_id, password) VALUES (1, 'user', 'user', '')")
+        for statement in LEGACY_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO textchat (chatroom_id, writer_id, time, text) VALUES (?, ?, ?, ?)",
+                                   texts)
+        connection.exec_driver_sql("INSERT INTO imagechat (chatroom_id, writer_id, time, image_id) "
+                                   "VALUES (?, ?, ?, ?)", images)
+        connection.exec_driver_sql("INSERT INTO chat (chatroom_id, writer_id, time, text, image_id) "
+                                   "VALUES (?, ?, ?, ?, ?)", chats)
+
+
+def legacy_history(session: Session, chatroom_id: int):
+    textchats = session.execute(text("SELECT * FROM textchat WHERE chatroom_id = :id"), {"id": chatroom_id}).all()
+    imagechats = session.execute(text("SELECT * FROM imagechat WHERE chatroom_id = :id"), {"id": chatroom_id}).all()
+    return sorted(textchats + imagechats, key=lambda x: datetime.fromisoformat(x.time))
+
+
+def report(label: str, func, repeat: int):
+    print(f"{label:<28} {statistics.fmean(measure(func, repeat)) * 1e3:10.3f} ms")
+
+
+def run(messages: int, rooms: int, image_ratio: float, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        start = time.perf_counter()
+        seed(engine, messages, rooms, image_ratio)
+        print(f"seeded {messages} messages in {rooms} rooms ({time.perf_counter() - start:.1f}s)")
+
+        chatroom = ChatRoom(id=1)
+        with Session(engine) as session:
+            report("legacy: latest message", lambda: legacy_history(session, 1)[-1], repeat)
+            report("unified: latest message", lambda: chat_repository.find_recent_chat(session, chatroom), repeat)
+            report("legacy: latest 50", lambda: legacy_history(session, 1)[-50:], repeat)
+            report("unified: latest 50", lambda: chat_repository.find_chats_page(session, chatroom), repeat)
+            cursor = chat_repository.to_cursor(chat_repository.find_chats_page(session, chatroom, limit=1000)[0][0])
+            report("legacy: 50 since cursor",
+                    lambda: [c for c in legacy_history(session, 1) if c.time > cursor][:50], repeat)
+            report("unified: 50 since cursor",
+                    lambda: chat_repository.find_chats_page(session, chatroom, after=cursor), repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat history read benchmark: two tables vs unified table")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--image-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.messages, args.rooms, args.image_ratio, args.repeat)
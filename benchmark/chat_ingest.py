@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from benchmark.common import seed_rooms
+from repository import user_repository, chatroom_repository, chat_repository
+from util.chat_pipeline import ChatPipeline
+from util.database import create_database_engine
+
+
+def write_one(engine, data):
+    with Session(engine) as session:
+        chatroom = chatroom_repository.find_by_id(session, data["chatroom_id"])
+        writer = user_repository.find_by_id(session, data["writer_id"])
+        return chat_repository.create_text_chat(session, chatroom, writer, data["text"])
+
+
+def write_batch(engine, batch: list) -> list:
+    with Session(engine, expire_on_commit=False) as session:
+        chats = []
+        for data in batch:
+            chatroom = chatroom_repository.find_by_id(session, data["chatroom_id"])
+            writer = user_repository.find_by_id(session, data["writer_id"])
+            chats.append(chat_repository.new_text_chat(chatroom, writer, data["text"]))
+        chat_repository.save_all(session, chats)
+        return [{"chatroom_id": chat.chatroom_id, "id": chat.id} for chat in chats]
+
+
+async def client(submit, chatroom_id: int, messages: int):
+    for i in range(messages):
+        await submit({"chatroom_id": chatroom_id, "writer_id": 1, "text": f"message {i}"})
+
+
+async def run_per_message(engine, clients: int, messages: int, rooms: int):
+    errors = 0
+
+    async def submit(data):
+        nonlocal errors
+        try:
+            await run_in_threadpool(write_one, engine, data)
+        except OperationalError:
+            errors += 1
+
+    await asyncio.gather(*(client(submit, i % rooms + 1, messages) for i in range(clients)))
+    return f"{errors} 'database is locked' errors"
+
+
+async def run_pipeline(engine, clients: int, messages: int, rooms: int):
+    last_ids = {}
+
+    async def publish(chatroom_id, chat):
+        assert chat["id"] > last_ids.get(chatroom_id, 0), "per-room order violated"
+        last_ids[chatroom_id] = chat["id"]
+
+    pipeline = ChatPipeline(lambda batch: write_batch(engine, batch), publish)
+    await pipeline.start()
+
+    async def submit(data):
+        await (await pipeline.submit(data))
+
+    await asyncio.gather(*(client(submit, i % rooms + 1, messages) for i in range(clients)))
+    await pipeline.stop()
+    return f"{pipeline.messages / pipeline.batches:.1f} messages/commit"
+
+
+def measure(label: str, engine, runner, clients: int, messages: int, rooms: int):
+    start = time.perf_counter()
+    result = asyncio.run(runner(engine, clients, messages, rooms))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {clients * messages / elapsed:8.1f} messages/s   {result}")
+
+
+def main(clients: int, messages: int, rooms: int):
+    print(f"{clients} clients x {messages} messages over {rooms} rooms")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, runner in (("per-message", run_per_message), ("batched", run_pipeline)):
+            engine = create_database_engine("sqlite:///" + os.path.join(directory, f"{label}.db"),
+                                            synchronous="FULL")
+            seed_rooms(engine, rooms)
+            measure(label, engine, runner, clients, messages, rooms)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat ingestion throughput: commit per message vs group commit")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--rooms", type=int, default=10)
+    args = parser.parse_args()
+    main(args.clients, args.messages, args.rooms)
@@ -0,0 +1,30 @@
+import statistics
+import time
+
+from sqlmodel import SQLModel, Session
+
+from domain import chat, image, friend_relation, user_session  # noqa: F401
+from repository import user_repository, chatroom_repository
+
+
+def seed_rooms(engine, rooms: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = user_repository.create(session, name="user", login_id="user", password="password")
+        for _ in range(rooms):
+            chatroom_repository.create_chatroom(session, [user])
+
+
+def measure(func, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(values: list, p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlmodel import Session, create_engine
+
+from benchmark.common import seed_rooms
+from repository import user_repository, chatroom_repository, chat_repository
+from util.database import create_database_engine
+
+
+def worker(engine, operations: int, rooms: int, write_ratio: float):
+    errors = timeouts = 0
+    for i in range(operations):
+        try:
+            with Session(engine) as session:
+                chatroom = chatroom_repository.find_by_id(session, random.randrange(rooms) + 1)
+                if random.random() < write_ratio:
+                    writer = user_repository.find_by_id(session, 1)
+                    chat_repository.create_text_chat(session, chatroom, writer, f"message {i}")
+                else:
+                    chat_repository.find_chats_page(session, chatroom)
+        except OperationalError:
+            errors += 1
+        except PoolTimeoutError:
+            timeouts += 1
+    return errors, timeouts
+
+
+def run(label: str, engine, threads: int, operations: int, rooms: int, write_ratio: float):
+    seed_rooms(engine, rooms)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(lambda _: worker(engine, operations, rooms, write_ratio), range(threads)))
+    elapsed = time.perf_counter() - start
+    errors = sum(result[0] for result in results)
+    timeouts = sum(result[1] for result in results)
+    print(f"{label:<8} {threads * operations / elapsed:8.1f} ops/s   {errors} 'database is locked' errors   "
+          f"{timeouts} pool timeouts")
+    engine.dispose()
+
+
+def main(threads: int, operations: int, rooms: int, write_ratio: float):
+    print(f"{threads} threads x {operations} operations, {write_ratio:.0%} writes")
+    os.environ["DB_POOL_SIZE"] = str(max(threads, int(os.environ.get("DB_POOL_SIZE", 10))))
+    with tempfile.TemporaryDirectory() as directory:
+        run("default", create_engine("sqlite:///" + os.path.join(directory, "default.db"), pool_size=threads),
+            threads, operations, rooms, write_ratio)
+        run("tuned", create_database_engine("sqlite:///" + os.path.join(directory, "tuned.db")),
+            threads, operations, rooms, write_ratio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput: default vs tuned SQLite engine")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.threads, args.operations, args.rooms, args.write_ratio)
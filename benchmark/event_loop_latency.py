@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from benchmark.common import seed_rooms, percentile
+from repository import user_repository, chatroom_repository, chat_repository
+from util.database import create_database_engine
+
+
+def write_chat(engine, chatroom_id: int, writer_id: int, index: int):
+    with Session(engine) as session:
+        chatroom = chatroom_repository.find_by_id(session, chatroom_id)
+        writer = user_repository.find_by_id(session, writer_id)
+        chat_repository.create_text_chat(session, chatroom, writer, f"message {index}")
+
+
+async def writer(engine, chatroom_id: int, writer_id: int, messages: int, offload: bool):
+    for i in range(messages):
+        if offload:
+            await run_in_threadpool(write_chat, engine, chatroom_id, writer_id, i)
+        else:
+            write_chat(engine, chatroom_id, writer_id, i)
+        await asyncio.sleep(0)
+
+
+async def probe(interval: float, lags: list, done: asyncio.Event):
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(engine, writers: int, messages: int, offload: bool):
+    lags = []
+    done = asyncio.Event()
+    probe_task = asyncio.create_task(probe(0.001, lags, done))
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(engine, 1, 1, messages, offload) for _ in range(writers)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    label = "offloaded" if offload else "blocking"
+    print(f"{label:<10} {writers * messages / elapsed:8.1f} writes/s   "
+          f"loop lag p50 {percentile(lags, 50) * 1e3:7.2f} ms   p99 {percentile(lags, 99) * 1e3:7.2f} ms   "
+          f"max {max(lags) * 1e3:7.2f} ms")
+
+
+def main(writers: int, messages: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        seed_rooms(engine, 1)
+
+        print(f"{writers} concurrent writers x {messages} messages")
+        asyncio.run(run(engine, writers, messages, offload=False))
+        asyncio.run(run(engine, writers, messages, offload=True))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event loop latency while chats are written to SQLite")
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+    main(args.writers, args.messages)
@@ -0,0 +1,110 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Annotated
+
+from fastapi import Depends, Header, Path, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from jinja2 import Environment, FileSystemLoader
+from sqlmodel import Session, create_engine
+
+import main
+from repository import user_repository, chatroom_repository
+from repository.chatroom_repository import get_chatroom_name
+
+
+# 변경 전 핸들러: 메시지 없이 페이지만 렌더링하고, 브라우저가 /chats를 다시 요청한다.
+@main.app.get("/legacy/chatrooms/{chatroom_id}")
+def get_legacy_chatroom(request: Request,
+                        user_id: Annotated[int | None, Header()],
+                        chatroom_id: Annotated[int | None, Path()],
+                        session: Session = Depends(main.session)):
+    user = user_repository.find_by_id(session, user_id)
+    chatroom = chatroom_repository.find_by_id(session, chatroom_id)
+    chatroom_repository.mark_read(session, chatroom.id, user.id)
+    info = jsonable_encoder(chatroom)
+    membership = chatroom_repository.find_membership(session, chatroom.id, user.id)
+    info["name"] = get_chatroom_name(chatroom, membership)
+    return main.templates.TemplateResponse("chatroom.html",
+                                           {"request": request, "chatroom": info, "login_user": user.id,
+                                            "chats": [], "has_more": False, "before": None, "last_seq": 0})
+
+
+def seed(engine, messages: int):
+    with Session(engine) as session:
+        user = user_repository.create(session, name="user", login_id="user", password="password")
+        friend = user_repository.create(session, name="friend", login_id="friend", password="password")
+        chatroom = chatroom_repository.create_chatroom(session, [user, friend])
+        chatroom_id, user_id, friend_id = chatroom.id, user.id, friend.id
+
+    start = datetime(2023, 1, 1)
+    chats = [(chatroom_id, i + 1, user_id if i % 2 else friend_id, (start + timedelta(seconds=i)).isoformat(),
+              f"message {i}\nline 2") for i in range(messages)]
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO chat (chatroom_id, seq, writer_id, time, text) "
+                                   "VALUES (?, ?, ?, ?, ?)", chats)
+        connection.exec_driver_sql("UPDATE chatroom SET last_seq = ?, last_chat_id = (SELECT max(id) FROM chat), "
+                                   "last_chat_time = ? WHERE id = ?", (messages, chats[-1][3], chatroom_id))
+
+
+def measure(client: TestClient, paths: list, repeat: int) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = 0
+        for path in paths:
+            size += len(client.get(path).content)
+        samples.append(time.perf_counter() - start)
+    return samples, size
+
+
+def report(label: str, samples: list, size: int, round_trips: int, rtt: float):
+    median = statistics.median(samples)
+    print(f"{label:<22} {round_trips} round trips  server {median * 1e3:7.2f} ms  {size / 1024:6.1f} KB  "
+          f"first render ~{(median + round_trips * rtt) * 1e3:7.1f} ms")
+
+
+def render_templates(repeat: int, **env_options) -> float:
+    env = Environment(loader=FileSystemLoader("templates"), autoescape=True, **env_options)
+    env.globals["static_url"] = main.static_files.url
+    env.filters.update(main.templates.env.filters)
+    context = {"chatroom": {"id": 1, "name": "room"}, "login_user": 1, "chats": [], "has_more": False,
+               "before": None, "last_seq": 0}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        env.get_template("chatroom.html").render(context)
+    return (time.perf_counter() - start) / repeat
+
+
+def run(messages: int, repeat: int, rtt: float):
+    with tempfile.TemporaryDirectory() as directory:
+        main.engine = create_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        with TestClient(main.app) as client:
+            start = time.perf_counter()
+            seed(main.engine, messages)
+            print(f"seeded {messages} messages ({time.perf_counter() - start:.1f}s), simulated RTT {rtt * 1e3:.0f} ms")
+            client.post("/login", data={"login_id": "user", "password": "password"})
+
+            measure(client, ["/chatrooms/1"], 5)
+            legacy, legacy_size = measure(client, ["/legacy/chatrooms/1", "/chatrooms/1/chats"], repeat)
+            rendered, rendered_size = measure(client, ["/chatrooms/1"], repeat)
+            report("page + /chats", legacy, legacy_size, 2, rtt)
+            report("server-side rendered", rendered, rendered_size, 1, rtt)
+        main.engine.dispose()
+
+    print(f"template compile every request {render_templates(repeat, cache_size=0) * 1e3:7.3f} ms")
+    print(f"template cache + auto_reload   {render_templates(repeat, auto_reload=True) * 1e3:7.3f} ms")
+    print(f"template cache                 {render_templates(repeat, auto_reload=False) * 1e3:7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time to first render of a chat room: AJAX history vs server-side")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=50)
+    args = parser.parse_args()
+    run(args.messages, args.repeat, args.rtt_ms / 1000)
@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import tempfile
+
+from sqlmodel import SQLModel, Session, select
+
+from benchmark.common import measure, percentile
+from domain import chat, chat_room, image, user_session  # noqa: F401
+from domain.friend_relation import FriendRelation
+from domain.user import User
+from repository import user_repository
+from util.database import create_database_engine
+from util.friend_cache import friend_cache
+
+
+def seed(engine, users: int, friends: int):
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (name, login_id, password) VALUES (?, ?, ?)",
+                                   [(f"user {random.randrange(users)}", f"user{i}", "password")
+                                    for i in range(users)])
+        connection.exec_driver_sql("INSERT INTO friendrelation (user_id, friend_id) VALUES (1, ?)",
+                                   [(friend_id,) for friend_id in random.sample(range(2, users + 1), friends)])
+
+
+def legacy_friends(session: Session, user: User):
+    friends = session.exec(select(FriendRelation).where(FriendRelation.user == user)).all()
+    return sorted(list(map(lambda x: x.friend, friends)), key=lambda x: x.name)
+
+
+def legacy_is_friend(session: Session, user: User, user_id: int):
+    return user_id in [x.id for x in legacy_friends(session, user)]
+
+
+def report(label: str, func, repeat: int):
+    timings = measure(func, repeat)
+    print(f"{label:<24} p50 {percentile(timings, 50) * 1e3:8.3f} ms   p99 {percentile(timings, 99) * 1e3:8.3f} ms")
+
+
+def run(users: int, friends: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        seed(engine, users, friends)
+        print(f"{friends} friends out of {users} users")
+        with Session(engine) as session:
+            user = user_repository.find_by_id(session, 1)
+            report("legacy: friend list", lambda: legacy_friends(session, user), repeat)
+            report("cached: friend list", lambda: user_repository.find_friends(session, user), repeat)
+            report("legacy: is friend", lambda: legacy_is_friend(session, user, users), repeat)
+            report("cached: is friend", lambda: user_repository.find_friend_ids(session, user, [users]), repeat)
+            print(f"cache hits={friend_cache.hits} misses={friend_cache.misses}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Friend list read benchmark: eager-loaded relations vs adjacency cache")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--friends", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+    run(args.users, args.friends, args.repeat)
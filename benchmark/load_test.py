@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlmodel import SQLModel
+
+import main
+from benchmark.common import percentile
+from repository.migration import migrate
+from util import metrics
+from util.database import create_database_engine
+from util.query_counter import QueryCounter
+
+HTTP_ROUTES = {
+    "/": 2,
+    "/chatrooms": 3,
+    "/chatrooms/{chatroom_id}": 1,
+    "/chatrooms/{chatroom_id}/chats": 3,
+    "/users": 1,
+}
+
+
+def seed(engine, rng: random.Random, users: int, friends: int, rooms: int, members: int, messages: int) -> dict:
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+
+    names = {user_id: f"user {user_id}" for user_id in range(1, users + 1)}
+    relations = [(user_id, friend_id) for user_id in names
+                 for friend_id in rng.sample(range(1, users + 1), min(friends + 1, users)) if friend_id != user_id]
+    room_members = {chatroom_id: rng.sample(range(1, users + 1), min(members, users))
+                    for chatroom_id in range(1, rooms + 1)}
+    memberships = [(chatroom_id, member_id, ", ".join(names[other] for other in room if other != member_id))
+                   for chatroom_id, room in room_members.items() for member_id in room]
+
+    start = datetime(2023, 1, 1)
+    seqs, chats = {}, []
+    for i in range(messages):
+        chatroom_id = rng.randrange(rooms) + 1
+        seqs[chatroom_id] = seqs.get(chatroom_id, 0) + 1
+        chats.append((chatroom_id, seqs[chatroom_id], rng.choice(room_members[chatroom_id]),
+                      (start + timedelta(seconds=i)).isoformat(), f"message {i}"))
+    last_chats = {chat[0]: (chat_id, chat[3], chat[1]) for chat_id, chat in enumerate(chats, start=1)}
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (id, name, login_id, password) VALUES (?, ?, ?, ?)",
+                                   [(user_id, name, f"user{user_id}", "password") for user_id, name in names.items()])
+        connection.exec_driver_sql("INSERT INTO usersession (session_id, user_id) VALUES (?, ?)",
+                                   [(f"session-{user_id}", user_id) for user_id in names])
+        connection.exec_driver_sql("INSERT INTO friendrelation (user_id, friend_id) VALUES (?, ?)", relations)
+        connection.exec_driver_sql("INSERT INTO chatroom (id, name, last_seq) VALUES (?, '', 0)",
+                                   [(chatroom_id,) for chatroom_id in room_members])
+        connection.exec_driver_sql("INSERT INTO chatroommember (chatroom_id, member_id, unread_count, display_name) "
+                                   "VALUES (?, ?, 0, ?)", memberships)
+        connection.exec_driver_sql("INSERT INTO chat (chatroom_id, seq, writer_id, time, text) "
+                                   "VALUES (?, ?, ?, ?, ?)", chats)
+        connection.exec_driver_sql("UPDATE chatroom SET last_chat_id = ?, last_chat_time = ?, last_seq = ? "
+                                   "WHERE id = ?", [(*last, chatroom_id) for chatroom_id, last in last_chats.items()])
+    return room_members
+
+
+class LoadClient:
+    def __init__(self, index: int, user_id: int, chatroom_id: int, rng: random.Random):
+        self.index = index
+        self.user_id = user_id
+        self.chatroom_id = chatroom_id
+        self.rng = rng
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self.pending = {}
+        self.latencies = []
+        self.sent = 0
+        self.received = 0
+        self.task = None
+
+    async def connect(self):
+        scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+                 "path": "/ws/connect", "raw_path": b"/ws/connect", "root_path": "",
+                 "query_string": f"chatroom_id={self.chatroom_id}".encode(),
+                 "headers": [(b"host", b"testserver"), (b"cookie", f"session_id=session-{self.user_id}".encode())],
+                 "client": ("127.0.0.1", 10000 + self.index), "server": ("testserver", 80), "subprotocols": []}
+        self.task = asyncio.create_task(main.app(scope, self.outbox.get, self.inbox.put))
+        await self.outbox.put({"type": "websocket.connect"})
+        accepted = await self.inbox.get()
+        if accepted["type"] != "websocket.accept":
+            raise RuntimeError(f"웹소켓 연결 실패: {accepted}")
+
+    async def run(self, measure_from: float, stop: float, interval: float):
+        reader = asyncio.create_task(self._read(measure_from))
+        n = 0
+        while time.perf_counter() < stop:
+            key = f"{self.index}:{n}"
+            now = time.perf_counter()
+            self.pending[key] = (now, now >= measure_from)
+            await self.outbox.put({"type": "websocket.receive", "text": json.dumps(
+                {"chat_type": "text", "writer_id": self.user_id, "chatroom_id": self.chatroom_id,
+                 "text": f"load {key}"})})
+            n += 1
+            self.sent += now >= measure_from
+            await asyncio.sleep(min(interval * (0.5 + self.rng.random()), max(stop - time.perf_counter(), 0)))
+
+        deadline = time.perf_counter() + 5
+        while self.pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        reader.cancel()
+
+    async def _read(self, measure_from: float):
+        while True:
+            message = await self.inbox.get()
+            if message["type"] != "websocket.send":
+                return
+            data = json.loads(message["text"])
+            if "ack" in data:
+                continue
+            self.received += time.perf_counter() >= measure_from
+            text = data.get("text") or ""
+            start, measured = self.pending.pop(text.removeprefix("load "), (None, False))
+            if measured:
+                self.latencies.append(time.perf_counter() - start)
+
+    async def close(self):
+        await self.outbox.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+
+async def http_worker(client: httpx.AsyncClient, rng: random.Random, room_members: dict, measure_from: float,
+                      stop: float, interval: float, results: dict):
+    routes, weights = list(HTTP_ROUTES), list(HTTP_ROUTES.values())
+    next_request = time.perf_counter() + interval * rng.random()
+    while next_request < stop:
+        await asyncio.sleep(max(next_request - time.perf_counter(), 0))
+        next_request = max(next_request + interval, time.perf_counter())
+        route = rng.choices(routes, weights)[0]
+        chatroom_id = rng.choice(list(room_members))
+        user_id = rng.choice(room_members[chatroom_id])
+        url = route.replace("{chatroom_id}", str(chatroom_id))
+        params = {"query": f"user {rng.randrange(len(room_members))}"} if route == "/users" else None
+
+        start = time.perf_counter()
+        response = await client.get(url, params=params, headers={"cookie": f"session_id=session-{user_id}"})
+        elapsed = time.perf_counter() - start
+        if start < measure_from:
+            continue
+
+        latencies, errors = results.setdefault(route, ([], [0]))
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+            errors[0] += 1
+
+
+def summarize(latencies: list) -> dict:
+    if not latencies:
+        return {"count": 0}
+    return {"count": len(latencies), "mean_ms": round(statistics.fmean(latencies) * 1e3, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1e3, 3), "p90_ms": round(percentile(latencies, 90) * 1e3, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1e3, 3), "max_ms": round(max(latencies) * 1e3, 3)}
+
+
+def queries_per_request(requests: dict, totals: dict) -> dict:
+    result = {}
+    for (method, route), (counts, total) in metrics.http_request_queries.values.items():
+        count = sum(counts) - requests.get((method, route), 0)
+        if count:
+            result[route] = round((total - totals.get((method, route), 0)) / count, 2)
+    return result
+
+
+async def drive(args, rng: random.Random, room_members: dict) -> dict:
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            chatroom_ids = [rng.choice(list(room_members)) for _ in range(args.clients)]
+            clients = [LoadClient(i, rng.choice(room_members[chatroom_id]), chatroom_id, random.Random(rng.random()))
+                       for i, chatroom_id in enumerate(chatroom_ids)]
+            for load_client in clients:
+                await load_client.connect()
+
+            http_results = {}
+            interval = args.http_concurrency / args.http_rate if args.http_rate else 0
+            baseline = {}
+
+            async def start_measuring():
+                await asyncio.sleep(args.warmup)
+                baseline["queries"] = counter.count
+                baseline["requests"] = {key: sum(counts) for key, (counts, _) in
+                                        metrics.http_request_queries.values.items()}
+                baseline["totals"] = {key: total for key, (_, total) in metrics.http_request_queries.values.items()}
+
+            with QueryCounter(main.engine) as counter:
+                measure_from = time.perf_counter() + args.warmup
+                stop = measure_from + args.duration
+                await asyncio.gather(
+                    start_measuring(),
+                    *(load_client.run(measure_from, stop, args.ws_interval) for load_client in clients),
+                    *(http_worker(client, random.Random(rng.random()), room_members, measure_from, stop, interval,
+                                  http_results) for _ in range(args.http_concurrency)))
+                drain = time.perf_counter() - stop
+
+            for load_client in clients:
+                await load_client.close()
+    finally:
+        await main.app.router.shutdown()
+
+    http_requests = sum(len(latencies) for latencies, _ in http_results.values())
+    ws_latencies = [latency for load_client in clients for latency in load_client.latencies]
+    received = sum(load_client.received for load_client in clients)
+    return {
+        "duration_seconds": args.duration,
+        "drain_seconds": round(drain, 3),
+        "http": {
+            "requests": http_requests,
+            "throughput_rps": round(http_requests / args.duration, 1),
+            "errors": sum(errors[0] for _, errors in http_results.values()),
+            "routes": {route: {**summarize(latencies), "errors": errors[0]}
+                       for route, (latencies, errors) in sorted(http_results.items())},
+        },
+        "websocket": {
+            "clients": len(clients),
+            "sent": sum(load_client.sent for load_client in clients),
+            "received": received,
+            "delivered_per_second": round(received / args.duration, 1),
+            "unacknowledged": sum(measured for load_client in clients for _, measured in load_client.pending.values()),
+            "round_trip": summarize(ws_latencies),
+        },
+        "db": {
+            "queries": counter.count - baseline["queries"],
+            "queries_per_second": round((counter.count - baseline["queries"]) / args.duration, 1),
+            "queries_per_request": queries_per_request(baseline["requests"], baseline["totals"]),
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        main.engine = create_database_engine("sqlite:///" + os.path.join(directory, "load.db"))
+        start = time.perf_counter()
+        room_members = seed(main.engine, rng, args.users, args.friends, args.rooms, args.members, args.messages)
+        seed_time = time.perf_counter() - start
+
+        result = asyncio.run(drive(args, rng, room_members))
+        main.engine.dispose()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "config": vars(args),
+        "seed_seconds": round(seed_time, 3),
+        **result,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load test: WebSocket chat clients plus HTTP traffic")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--friends", type=int, default=20, help="friends per user")
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--members", type=int, default=4, help="members per room")
+    parser.add_argument("--messages", type=int, default=100_000, help="chat history seeded before the run")
+    parser.add_argument("--clients", type=int, default=100, help="simulated WebSocket clients")
+    parser.add_argument("--ws-interval", type=float, default=2.0, help="mean seconds between chats per client")
+    parser.add_argument("--http-concurrency", type=int, default=8)
+    parser.add_argument("--http-rate", type=float, default=20, help="target HTTP requests/s, 0 for as fast as possible")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds, after the warm-up")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of load excluded from the report")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = json.dumps(run(args), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(report + "\n")
+    else:
+        print(report)
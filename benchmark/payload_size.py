@@ -0,0 +1,75 @@
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+import main
+from domain.chat import Chat
+from domain.image import Image
+from domain.user import User
+from util.connection_manager import encode
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_chats(count: int) -> list:
+    writers = [User(id=i, name=f"사용자 {i}", login_id=f"user{i}", password="password123") for i in range(1, 11)]
+    image = Image(id=1, name="photo.png", image_name="a" * 64 + ".png", image_type="image",
+                  content_hash="a" * 64, size=123456, thumbnail_name="a" * 64 + "_thumbnail.jpg")
+    chats = []
+    for i in range(count):
+        writer = writers[i % len(writers)]
+        chat = Chat(id=i + 1, chatroom_id=1, seq=i + 1, writer_id=writer.id, time=datetime.now().isoformat(),
+                    text=None if i % 10 == 0 else f"안녕하세요, 메시지 {i} 입니다.")
+        chat.writer = writer
+        if i % 10 == 0:
+            chat.image_id = image.id
+            chat.image = image
+        chats.append(chat)
+    return chats
+
+
+def legacy_payload(chat) -> str:
+    payload = jsonable_encoder(chat)
+    payload["chat_type"] = chat.chat_type()
+    payload["writer"] = jsonable_encoder(chat.writer)
+    if chat.image_id is not None:
+        payload["image"] = jsonable_encoder(chat.image)
+    return json.dumps(jsonable_encoder(payload))
+
+
+def deflate_stream(frames: list) -> int:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return sum(len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4 for frame in frames)
+
+
+def measure(label: str, chats: list, encoder):
+    start = time.perf_counter()
+    frames = [encoder(chat) for chat in chats]
+    elapsed = time.perf_counter() - start
+    frames = [frame.encode() if isinstance(frame, str) else frame for frame in frames]
+    per_1k = 1000 / len(chats)
+    print(f"{label:<10} {sum(map(len, frames)) * per_1k / 1024:8.1f} KB   "
+          f"{deflate_stream(frames) * per_1k / 1024:8.1f} KB deflated   {elapsed * per_1k * 1e3:7.2f} ms encode")
+
+
+def run(messages: int):
+    chats = make_chats(messages)
+    print("per 1k messages")
+    measure("legacy", chats, legacy_payload)
+    measure("json", chats, lambda chat: encode(main.chat_payload(chat)))
+    if msgpack is not None:
+        measure("msgpack", chats, lambda chat: msgpack.packb(main.chat_payload(chat)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket bytes on the wire and encode CPU per 1k messages")
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.messages)
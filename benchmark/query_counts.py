@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine
+
+import main
+from repository import user_repository, chatroom_repository, chat_repository
+from util.query_counter import QueryCounter
+
+# 요청당 허용되는 최대 쿼리 수. 데이터 크기와 무관해야 한다.
+BUDGETS = {
+    "/chatrooms": 8,
+    "/chatrooms/{id}": 10,
+    "/chatrooms/{id}/chats": 8,
+    "POST /groupchat": 8,
+}
+
+
+def seed(engine, rooms: int, chats_per_room: int):
+    with Session(engine) as session:
+        user = user_repository.create(session, name="user", login_id="user", password="password")
+        for i in range(rooms):
+            friend = user_repository.create(session, name=f"friend {i}", login_id=f"friend{i}", password="password")
+            chatroom = chatroom_repository.create_chatroom(session, [user, friend])
+            for j in range(chats_per_room):
+                writer = user if j % 2 else friend
+                chat_repository.create_text_chat(session, chatroom, writer, f"message {j}")
+
+
+def count_queries(rooms: int, chats_per_room: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        main.engine = create_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        with TestClient(main.app) as client:
+            seed(main.engine, rooms, chats_per_room)
+            client.post("/login", data={"login_id": "user", "password": "password"})
+
+            counts = {}
+            with QueryCounter(main.engine) as counter:
+                client.get("/chatrooms")
+            counts["/chatrooms"] = counter.count
+            with QueryCounter(main.engine) as counter:
+                client.get("/chatrooms/1")
+            counts["/chatrooms/{id}"] = counter.count
+            with QueryCounter(main.engine) as counter:
+                client.get("/chatrooms/1/chats")
+            counts["/chatrooms/{id}/chats"] = counter.count
+            with QueryCounter(main.engine) as counter:
+                client.post("/groupchat", json={"name": "", "member_ids": list(range(2, rooms + 2))})
+            counts["POST /groupchat"] = counter.count
+        main.engine.dispose()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assert per-request query counts do not grow with data size")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=20)
+    args = parser.parse_args()
+
+    small = count_queries(2, 2)
+    large = count_queries(args.rooms, args.chats)
+    failed = False
+    for path, budget in BUDGETS.items():
+        ok = small[path] == large[path] <= budget
+        failed |= not ok
+        print(f"{'ok' if ok else 'FAIL':<5} {path:<24} small={small[path]} large={large[path]} budget={budget}")
+    sys.exit(1 if failed else 0)
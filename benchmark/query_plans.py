@@ -0,0 +1,74 @@
+import os
+import re
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+
+import main
+from util.database import create_database_engine
+from util.query_counter import QueryCounter
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (COVERING )?INDEX)(?! VIRTUAL TABLE)")
+
+
+def exercise(client: TestClient):
+    for name in ["user", "friend", "other"]:
+        client.post("/register", data={"name": f"{name} name", "login_id": name, "password": "password"})
+    client.post("/login", data={"login_id": "user", "password": "password"})
+    client.post("/friends/2")
+    client.post("/friends/3")
+    client.get("/")
+    client.get("/users", params={"query": "name"})
+    client.get("/users", params={"query": "fr"})
+    client.get("/single-chats/2", follow_redirects=False)
+    client.get("/single-chats/2", follow_redirects=False)
+    client.post("/groupchat", json={"name": "group", "member_ids": [2, 3]})
+    client.get("/groupchat")
+    with client.websocket_connect("/ws/connect?chatroom_id=1&last_seq=0") as ws:
+        ws.send_json({"chat_type": "text", "writer_id": 1, "chatroom_id": 1, "text": "hello"})
+        ws.receive_json()
+        ws.send_json({"action": "read", "chatroom_id": 1})
+    client.get("/chatrooms")
+    client.get("/chatrooms/1")
+    chats = client.get("/chatrooms/1/chats").json()
+    client.get("/chatrooms/1/chats", params={"before": chats["before"]})
+    client.get("/chatrooms/1/chats", params={"after": chats["after"]})
+    main.manager.histories.clear()
+    with client.websocket_connect("/ws/connect?chatroom_id=1&last_seq=0"):
+        pass
+    client.get("/logout", follow_redirects=False)
+
+
+def explain(connection, statement: str, parameters) -> list:
+    return [row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()]
+
+
+def run() -> bool:
+    with tempfile.TemporaryDirectory() as directory:
+        main.engine = create_database_engine("sqlite:///" + os.path.join(directory, "plans.db"))
+        with TestClient(main.app) as client, QueryCounter(main.engine) as counter:
+            exercise(client)
+
+        plans = {}
+        with main.engine.connect() as connection:
+            for statement, parameters in zip(counter.statements, counter.parameters):
+                if statement.split()[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+                    continue
+                if statement not in plans:
+                    plans[statement] = explain(connection, statement, parameters)
+        main.engine.dispose()
+
+    failed = False
+    for statement, plan in plans.items():
+        scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+        failed |= bool(scans)
+        print(f"{'FAIL' if scans else 'ok':<5} {' '.join(statement.split())[:110]}")
+        for detail in scans:
+            print(f"      {detail}")
+    print(f"{len(plans)} distinct queries checked")
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
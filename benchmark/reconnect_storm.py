@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session
+
+import main
+from repository import user_repository, chatroom_repository, chat_repository
+from util.connection_manager import ConnectionManager, encode
+from util.database import create_database_engine
+from util.query_counter import QueryCounter
+
+
+class FakeWebSocket:
+    scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def seed(engine, rooms: int, chats_per_room: int):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        user = user_repository.create(session, name="user", login_id="user", password="password")
+        for _ in range(rooms):
+            chatroom = chatroom_repository.create_chatroom(session, [user])
+            chat_repository.save_all(session, [chat_repository.new_text_chat(chatroom, user, f"message {i}")
+                                               for i in range(chats_per_room)])
+
+
+def reload_history(chatroom_id: int):
+    with Session(main.engine) as session:
+        chatroom = chatroom_repository.find_by_id(session, chatroom_id)
+        chats, _ = chat_repository.find_chats_page(session, chatroom)
+        return [encode(main.chat_payload(chat)) for chat in chats]
+
+
+async def full_reload(clients: int, rooms: int, gap: int, chats_per_room: int):
+    await asyncio.gather(*(main.run_in_threadpool(reload_history, i % rooms + 1) for i in range(clients)))
+
+
+def warm_manager(rooms: int, chats_per_room: int) -> ConnectionManager:
+    manager = ConnectionManager()
+    for chatroom_id in range(1, rooms + 1):
+        rows, _ = main.find_resync_chats(chatroom_id, chats_per_room - manager.history_size)
+        for _, message in rows:
+            manager.deliver(chatroom_id, message)
+    return manager
+
+
+async def resume(manager: ConnectionManager, clients: int, rooms: int, gap: int, chats_per_room: int):
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    for ws in sockets:
+        await manager.connect(ws)
+    await asyncio.gather(*(manager.resume(ws, i % rooms + 1, chats_per_room - gap, main.load_resync_chats)
+                           for i, ws in enumerate(sockets)))
+    for ws in sockets:
+        await manager.disconnect(ws)
+
+
+def measure(label: str, runner):
+    with QueryCounter(main.engine) as counter:
+        start = time.perf_counter()
+        asyncio.run(runner())
+        elapsed = time.perf_counter() - start
+    print(f"{label:<14} {elapsed * 1e3:8.1f} ms   {counter.count:6d} queries")
+
+
+def run(clients: int, rooms: int, gap: int, chats_per_room: int):
+    print(f"{clients} clients reconnect to {rooms} rooms, {gap} missed messages each")
+    with tempfile.TemporaryDirectory() as directory:
+        main.engine = create_database_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        seed(main.engine, rooms, chats_per_room)
+        measure("full reload", lambda: full_reload(clients, rooms, gap, chats_per_room))
+        measure("resume (cold)", lambda: resume(ConnectionManager(), clients, rooms, gap, chats_per_room))
+        warm = warm_manager(rooms, chats_per_room)
+        measure("resume (warm)", lambda: resume(warm, clients, rooms, gap, chats_per_room))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconnect storm: history reload vs sequence-number resume")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--gap", type=int, default=5)
+    parser.add_argument("--chats-per-room", type=int, default=300)
+    args = parser.parse_args()
+    run(args.clients, args.rooms, args.gap, args.chats_per_room)
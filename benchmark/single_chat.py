@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from domain import chat, image, friend_relation, user_session  # noqa: F401
+from domain.chat_room import ChatRoom
+from domain.user import User
+from repository import chatroom_repository
+
+
+def seed(engine, rooms: int):
+    SQLModel.metadata.create_all(engine)
+    users = rooms + 1
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (name, login_id, password) VALUES (?, ?, ?)",
+                                   [(f"user {i}", f"user{i}", "password") for i in range(users)])
+        connection.exec_driver_sql("INSERT INTO chatroom (name, direct_key) VALUES ('', ?)",
+                                   [(chatroom_repository.get_direct_key(1, i + 2),) for i in range(rooms)])
+        connection.exec_driver_sql("INSERT INTO chatroommember (chatroom_id, member_id, unread_count) VALUES (?, ?, 0)",
+                                   [(i + 1, member) for i in range(rooms) for member in (1, i + 2)])
+
+
+def legacy_get_single_chat(session: Session, user: User, other: User):
+    chatrooms = list(session.exec(select(ChatRoom)).all())
+    for chatroom in chatrooms:
+        chatroom_members = list(map(lambda x: x.member, chatroom.members))
+        if len(chatroom_members) != 2:
+            continue
+
+        if user in chatroom_members and other in chatroom_members:
+            return chatroom
+
+
+def measure(label: str, engine, func, pairs: list):
+    start = time.perf_counter()
+    for user_id, other_id in pairs:
+        with Session(engine) as session:
+            func(session, session.get(User, user_id), session.get(User, other_id))
+    elapsed = (time.perf_counter() - start) / len(pairs)
+    print(f"{label:<10} {elapsed * 1e3:10.3f} ms/lookup")
+
+
+def run(rooms: int, lookups: int, legacy_lookups: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        seed(engine, rooms)
+        print(f"seeded {rooms} direct chat rooms")
+
+        pairs = [(random.randrange(2, rooms + 2), 1) for _ in range(lookups)]
+        measure("indexed", engine, chatroom_repository.get_single_chat, pairs)
+        if legacy_lookups:
+            measure("legacy", engine, legacy_get_single_chat, pairs[:legacy_lookups])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="1:1 chat room lookup benchmark")
+    parser.add_argument("--rooms", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=1_000)
+    parser.add_argument("--legacy-lookups", type=int, default=1, help="the legacy scan is slow; keep this small")
+    args = parser.parse_args()
+    run(args.rooms, args.lookups, args.legacy_lookups)
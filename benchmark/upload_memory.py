@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fastapi import FastAPI, UploadFile
+from starlette.responses import JSONResponse
+from sqlmodel import SQLModel
+
+import main
+from repository import image_repository
+from repository.migration import migrate
+from util.database import create_database_engine
+
+BOUNDARY = "benchmark-boundary"
+CHUNK_SIZE = 64 * 1024
+
+legacy_app = FastAPI()
+legacy_app.middleware("http")(main.authentication_filter)
+legacy_app.middleware("http")(main.record_metrics)
+
+
+@legacy_app.post("/images")
+async def legacy_upload_image(file: UploadFile):
+    size = 0
+    with open(os.path.join("static", "legacy.tmp"), "wb") as fp:
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+            if size > image_repository.MAX_UPLOAD_SIZE:
+                return JSONResponse({"error": "too large"}, status_code=413)
+            fp.write(chunk)
+    return JSONResponse({"size": size})
+
+
+def multipart_body(size: int) -> tuple:
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="upload.bin"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    block = os.urandom(CHUNK_SIZE)
+
+    def chunks():
+        yield head + os.urandom(CHUNK_SIZE)
+        for _ in range(size * 1024 * 1024 // CHUNK_SIZE - 1):
+            yield block
+        yield tail
+
+    return chunks(), len(head) + size * 1024 * 1024 + len(tail)
+
+
+async def upload(app, size: int, content_length: bool) -> dict:
+    chunks, length = multipart_body(size)
+    headers = [(b"host", b"testserver"), (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(length).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": "/images", "raw_path": b"/images", "root_path": "", "query_string": b"", "headers": headers,
+             "client": ("127.0.0.1", 10000), "server": ("testserver", 80)}
+    result = {"received": 0, "status": None}
+    finished = asyncio.Event()
+    pending = next(chunks)
+
+    async def receive():
+        nonlocal pending
+        if pending is None or finished.is_set():
+            await finished.wait()
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(0)
+        body, pending = pending, next(chunks, None)
+        result["received"] += len(body)
+        return {"type": "http.request", "body": body, "more_body": pending is not None}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif not message.get("more_body"):
+            finished.set()
+
+    await app(scope, receive, send)
+    return result
+
+
+def measure(label: str, app, size: int, content_length: bool):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = asyncio.run(upload(app, size, content_length))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} {result['status']}   received {result['received'] / 1024 / 1024:8.1f} MB   "
+          f"peak {peak / 1024 / 1024:6.1f} MB   {elapsed * 1e3:8.1f} ms")
+
+
+def run(sizes: list, content_length: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs("static")
+        main.engine = create_database_engine("sqlite:///" + os.path.join(directory, "upload.db"))
+        SQLModel.metadata.create_all(main.engine)
+        migrate(main.engine)
+        print(f"limit {image_repository.MAX_UPLOAD_SIZE // 1024 // 1024} MB, "
+              f"{'with' if content_length else 'without'} Content-Length")
+        for size in sizes:
+            print(f"{size} MB upload")
+            measure("form", legacy_app, size, content_length)
+            measure("stream", main.app, size, content_length)
+        main.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="POST /images through the ASGI app: spooled form parsing vs "
+                                                 "streamed multipart with the size limit on the raw body")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256], help="upload sizes in MB")
+    parser.add_argument("--chunked", action="store_true", help="send without a Content-Length header")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    run(args.sizes, not args.chunked)
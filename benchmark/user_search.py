@@ -0,0 +1,98 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session, select
+
+from benchmark.common import percentile
+from domain import chat, chat_room, image, friend_relation, user_session  # noqa: F401
+from domain.friend_relation import FriendRelation
+from domain.user import User
+from repository import user_repository
+from repository.migration import migrate
+from util.database import create_database_engine
+
+FAMILY_NAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN_SYLLABLES = "민서준지현우예도하윤수아은채연호진영성"
+ENGLISH_NAMES = ["james", "mary", "robert", "linda", "michael", "sarah", "david", "emma", "daniel", "olivia"]
+
+
+def random_name(index: int) -> str:
+    if index % 3 == 0:
+        return f"{random.choice(ENGLISH_NAMES)}{random.choice(ENGLISH_NAMES)}{index % 1000}"
+    return random.choice(FAMILY_NAMES) + "".join(random.choices(GIVEN_SYLLABLES, k=2))
+
+
+def seed(engine, users: int, friends: int):
+    SQLModel.metadata.create_all(engine)
+    migrate(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (name, login_id, password) VALUES (?, ?, ?)",
+                                   [(random_name(i), f"user{i}", "password") for i in range(users)])
+        connection.exec_driver_sql("INSERT INTO friendrelation (user_id, friend_id) VALUES (1, ?)",
+                                   [(friend_id,) for friend_id in random.sample(range(2, users + 1), friends)])
+
+
+def legacy_search(session: Session, user: User, query: str):
+    users = list(session.exec(select(User).where(User.name.contains(query))).all())
+    friends = [x.friend for x in session.exec(select(FriendRelation).where(FriendRelation.user == user)).all()]
+    if user in users:
+        users.remove(user)
+    return sorted([{"user": x, "is_friend": x in friends} for x in users], key=lambda x: x["is_friend"])
+
+
+def indexed_search(session: Session, user: User, query: str):
+    users = user_repository.find_by_name(session, query, 21, 0, exclude_id=user.id)
+    friend_ids = user_repository.find_friend_ids(session, user, [x.id for x in users])
+    return sorted([{"user": x, "is_friend": x.id in friend_ids} for x in users], key=lambda x: x["is_friend"])
+
+
+def measure(label: str, engine, search, queries: list):
+    timings = []
+    results = 0
+    with Session(engine) as session:
+        user = user_repository.find_by_id(session, 1)
+        for query in queries:
+            start = time.perf_counter()
+            results += len(search(session, user, query))
+            timings.append(time.perf_counter() - start)
+    print(f"{label:<8} p50 {percentile(timings, 50) * 1e3:8.2f} ms   p99 {percentile(timings, 99) * 1e3:8.2f} ms   "
+          f"{results / len(queries):8.1f} results/query")
+
+
+def make_queries(count: int) -> list:
+    queries = []
+    for _ in range(count):
+        name = random_name(random.randrange(1000000))
+        length = random.choice([1, 2, 3, 4])
+        start = random.randrange(max(len(name) - length, 0) + 1)
+        queries.append(name[start:start + length])
+    return queries
+
+
+def run(users: int, friends: int, queries: int, legacy_queries: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine("sqlite:///" + os.path.join(directory, "bench.db"))
+        start = time.perf_counter()
+        seed(engine, users, friends)
+        print(f"seeded {users} users in {time.perf_counter() - start:.1f} s")
+
+        searches = make_queries(queries)
+        measure("indexed", engine, indexed_search, searches)
+        if legacy_queries:
+            measure("legacy", engine, legacy_search, searches[:legacy_queries])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="User name search: LIKE scan vs FTS5 trigram / prefix index")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--friends", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--legacy-queries", type=int, default=1)
+    args = parser.parse_args()
+    run(args.users, args.friends, args.queries, args.legacy_queries)
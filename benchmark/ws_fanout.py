@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from util.connection_manager import ConnectionManager
+from util.metrics import websocket_send_latency
+
+
+class FakeWebSocket:
+    scope = {}
+
+    def __init__(self, stalled: bool = False):
+        self.sent = 0
+        self.stalled = stalled
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent += 1
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def drain(manager: ConnectionManager):
+    while any(c.queue.qsize() and not c.ws.stalled for c in manager.connections.values()):
+        await asyncio.sleep(0)
+
+
+async def run(connections: int, rooms: int, messages: int, stalled: float, queue_size: int):
+    manager = ConnectionManager(max_queue_size=queue_size)
+    sockets = [FakeWebSocket(stalled=random.random() < stalled) for _ in range(connections)]
+
+    start = time.perf_counter()
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws)
+        manager.subscribe(ws, i % rooms)
+    subscribe_time = time.perf_counter() - start
+
+    targets = [random.randrange(rooms) for _ in range(messages)]
+    start = time.perf_counter()
+    for chatroom_id in targets:
+        await manager.broadcast(chatroom_id, {"chatroom_id": chatroom_id, "text": "hello"})
+        await asyncio.sleep(0)
+    await drain(manager)
+    broadcast_time = time.perf_counter() - start
+    sends = sum(ws.sent for ws in sockets)
+    counts, latency_total = websocket_send_latency.values.get((), ([0], 0.0))
+
+    start = time.perf_counter()
+    for ws in sockets:
+        await manager.disconnect(ws)
+    disconnect_time = time.perf_counter() - start
+
+    if any(ws.stalled for ws in sockets) and messages / rooms > queue_size + 1 and not manager.evicted_connections:
+        raise RuntimeError("멈춘 클라이언트가 제거되지 않았습니다.")
+    return "\n".join([
+        f"connections={connections} rooms={rooms} messages={messages} stalled={stalled:.0%} queue={queue_size}",
+        f"subscribe:  {subscribe_time / connections * 1e6:.2f} us/connection",
+        f"broadcast:  {broadcast_time / messages * 1e6:.2f} us/message, {sends / messages:.1f} sends/message",
+        f"latency:    avg {latency_total / max(sum(counts), 1) * 1e3:.2f} ms over {sum(counts)} sends",
+        f"evicted:    {manager.evicted_connections} connections",
+        f"disconnect: {disconnect_time / connections * 1e6:.2f} us/connection",
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket fan-out benchmark")
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--rooms", type=int, default=1_000)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--stalled", type=float, default=0.0, help="fraction of clients that never read")
+    parser.add_argument("--queue-size", type=int, default=8,
+                        help="per-connection send queue; keep it below messages/rooms so stalled clients overflow")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+    print(asyncio.run(run(args.connections, args.rooms, args.messages, args.stalled, args.queue_size)))
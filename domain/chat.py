@@ -1,38 +1,31 @@
 import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
-class Chat(SQLModel):
+class Chat(SQLModel, table=True):
+    __table_args__ = (Index("ix_chat_chatroom_id_time_id", "chatroom_id", "time", "id"),
+                      Index("ix_chat_chatroom_id_seq", "chatroom_id", "seq", unique=True))
+
     id: Optional[int] = Field(default=None, primary_key=True)
     chatroom_id: Optional[int] = Field(default=None, foreign_key="chatroom.id")
+    seq: Optional[int] = None
     writer_id: Optional[int] = Field(default=None, foreign_key="user.id")
     time: str
-
-    def date_time(self):
-        return datetime.datetime.fromisoformat(self.time)
-
-    def chat_type(self):
-        pass
-
-
-class TextChat(Chat, table=True):
-    text: str
-
-    chatroom: Optional["ChatRoom"] = Relationship()
-    writer: Optional["User"] = Relationship()
-
-    def chat_type(self):
-        return "text"
-
-
-class ImageChat(Chat, table=True):
+    text: Optional[str] = None
     image_id: Optional[int] = Field(default=None, foreign_key="image.id")
+    file_name: Optional[str] = None
 
     chatroom: Optional["ChatRoom"] = Relationship()
     writer: Optional["User"] = Relationship()
     image: Optional["Image"] = Relationship()
 
+    def date_time(self):
+        return datetime.datetime.fromisoformat(self.time)
+
     def chat_type(self):
+        if self.image_id is None:
+            return "text"
         return self.image.image_type
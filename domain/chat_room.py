@@ -1,19 +1,35 @@
 from typing import Optional, List
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
 class ChatRoom(SQLModel, table=True):
+    __table_args__ = (Index("ix_chatroom_direct_key", "direct_key", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = ""
+    direct_key: Optional[str] = None
+    last_chat_id: Optional[int] = None
+    last_chat_time: Optional[str] = Field(default=None, index=True)
+    last_seq: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     members: List["ChatRoomMember"] = Relationship(back_populates="chatroom")
+    last_chat: Optional["Chat"] = Relationship(
+        sa_relationship_kwargs={"primaryjoin": "foreign(ChatRoom.last_chat_id)==Chat.id", "viewonly": True}
+    )
 
 
 class ChatRoomMember(SQLModel, table=True):
+    __table_args__ = (Index("ix_chatroommember_chatroom_id_member_id", "chatroom_id", "member_id", unique=True),
+                      Index("ix_chatroommember_member_id", "member_id"))
+
     id: Optional[int] = Field(default=None, primary_key=True)
     chatroom_id: Optional[int] = Field(default=None, foreign_key="chatroom.id")
     member_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    unread_count: int = 0
+    last_read_chat_id: Optional[int] = None
+    display_name: Optional[str] = None
 
     chatroom: Optional["ChatRoom"] = Relationship(back_populates="members")
     member: Optional["User"] = Relationship()
@@ -1,9 +1,12 @@
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
 class FriendRelation(SQLModel, table=True):
+    __table_args__ = (Index("ix_friendrelation_user_id_friend_id", "user_id", "friend_id", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     friend_id: Optional[int] = Field(default=None, foreign_key="user.id")
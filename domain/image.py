@@ -1,10 +1,16 @@
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 
 class Image(SQLModel, table=True):
+    __table_args__ = (Index("ix_image_content_hash", "content_hash", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     image_name: str
     image_type: str
+    content_hash: Optional[str] = None
+    size: Optional[int] = None
+    thumbnail_name: Optional[str] = None
@@ -1,5 +1,6 @@
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -10,6 +11,9 @@ class UserBase(SQLModel):
 
 
 class User(UserBase, table=True):
+    __table_args__ = (Index("ix_user_name", "name"),
+                      Index("ix_user_login_id", "login_id", unique=True))
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     session: Optional["UserSession"] = Relationship(back_populates="user")
@@ -1,5 +1,6 @@
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -9,6 +10,9 @@ class UserSessionBase(SQLModel):
 
 
 class UserSession(UserSessionBase, table=True):
+    __table_args__ = (Index("ix_usersession_session_id", "session_id", unique=True),
+                      Index("ix_usersession_user_id", "user_id"))
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     user: Optional["User"] = Relationship(back_populates="session")
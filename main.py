@@ -1,31 +1,67 @@
-from time import mktime
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from functools import partial
 from typing import Annotated
 
 import uvicorn
-from fastapi import FastAPI, Depends, Form, Request, Header, Path, UploadFile
+from fastapi import FastAPI, Depends, Form, Request, Header, Path, Query, BackgroundTasks
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlmodel import SQLModel, Session
-from sqlmodel import create_engine
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import MutableHeaders
-from starlette.responses import JSONResponse, FileResponse
-from starlette.status import HTTP_201_CREATED
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse, HTMLResponse, Response
+from starlette.status import HTTP_201_CREATED, WS_1008_POLICY_VIOLATION
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
+from domain.image import Image
 from repository.chatroom_repository import get_chatroom_name
-from util.user_exceptions import SessionNotFoundException, LoginException, DuplicateUserException
+from util.user_exceptions import SessionNotFoundException, LoginException, DuplicateUserException, \
+    InvalidCursorException, UploadTooLargeException, InvalidUploadException
 from repository import user_repository, chatroom_repository, chat_repository, image_repository
-from util.connection_manager import manager
+from repository.migration import migrate
+from util.chat_pipeline import ChatPipeline
+from util.connection_manager import manager, encode
+from util.database import create_database_engine
+from util.friend_cache import friend_cache
+from util.http_cache import CachedStaticFiles, compress_static, media_response
+from util.message_bus import create_bus
+from util.metrics import registry, request_stats, RequestStats, CONTENT_TYPE, Profiler, instrument_engines, \
+    observe_request, is_profiling_enabled
+from util.multipart_upload import MultipartUpload
+from util.session_cache import session_cache
+from util.thumbnail import thumbnail_generator
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
-app.mount("/static", StaticFiles(directory="static", html=True), name="static")
-templates = Jinja2Templates(directory="templates")
-engine = create_engine("sqlite:///database.db")
+static_files = CachedStaticFiles(directory="static", html=True)
+app.mount("/static", static_files, name="static")
+templates = Jinja2Templates(directory="templates",
+                            auto_reload=os.environ.get("TEMPLATE_AUTO_RELOAD", "false").lower() == "true")
+templates.env.globals["static_url"] = static_files.url
+engine = create_database_engine()
+instrument_engines()
 
 
-def session():
+def session(connection: HTTPConnection):
+    request_session = getattr(connection.state, "session", None)
+    if request_session is not None:
+        yield request_session
+        return
+
     with Session(engine) as session:
         yield session
 
@@ -33,6 +69,21 @@ def session():
 @app.on_event("startup")
 def setup():
     SQLModel.metadata.create_all(engine)
+    migrate(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    compress_static("static")
+
+
+@app.on_event("startup")
+async def start_message_bus():
+    await manager.start(create_bus(os.environ.get("CHAT_BUS_URL", "memory://")))
+
+
+@app.on_event("shutdown")
+async def stop_message_bus():
+    await manager.stop()
 
 
 # TODO: PRG 적용
@@ -46,6 +97,21 @@ def login_exception_handler(request: Request, error: LoginException):
     return templates.TemplateResponse("login_form.html", {"request": request, "error": error.description()})
 
 
+@app.exception_handler(InvalidCursorException)
+def invalid_cursor_exception_handler(request: Request, error: InvalidCursorException):
+    return JSONResponse({"error": error.description()}, status_code=400)
+
+
+@app.exception_handler(UploadTooLargeException)
+def upload_too_large_exception_handler(request: Request, error: UploadTooLargeException):
+    return JSONResponse({"error": error.description()}, status_code=413)
+
+
+@app.exception_handler(InvalidUploadException)
+def invalid_upload_exception_handler(request: Request, error: InvalidUploadException):
+    return JSONResponse({"error": error.description()}, status_code=400)
+
+
 def update_header(request: Request, key, value):
     header = MutableHeaders(request._headers)
     header[key] = str(value)
@@ -55,7 +121,7 @@ def update_header(request: Request, key, value):
 
 
 def is_whitelist(path):
-    whitelist = ["/login", "/register", "/static", "/favicon.ico", "/images"]
+    whitelist = ["/login", "/register", "/static", "/favicon.ico", "/images", "/metrics"]
     for url in whitelist:
         if path.startswith(url):
             return True
@@ -66,21 +132,56 @@ def is_whitelist(path):
 async def authentication_filter(request: Request, call_next):
     path = request.url.path
 
-    if not is_whitelist(path):
-        if "session_id" not in request.cookies:
-            print("세션이 존재하지 않습니다.")
-            return RedirectResponse(url="/login", status_code=302)
+    with Session(engine) as session:
+        request.state.session = session
+
+        if not is_whitelist(path):
+            if "session_id" not in request.cookies:
+                logger.debug("세션이 존재하지 않습니다. path=%s", path)
+                return RedirectResponse(url="/login", status_code=302)
 
-        try:
-            with Session(engine) as session:
+            try:
                 session_id = request.cookies["session_id"]
-                user = user_repository.find_by_session_id(session, session_id)
-                request = update_header(request, key="user-id", value=user.id)
-        except SessionNotFoundException as e:
-            print(e)
-            return RedirectResponse(url="/login", status_code=302)
+                user_id = session_cache.get(session_id)
+                if user_id is None:
+                    user_id = await run_in_threadpool(user_repository.find_user_id_by_session_id, session, session_id)
+                request = update_header(request, key="user-id", value=user_id)
+            except SessionNotFoundException as e:
+                logger.debug("%s", e)
+                return RedirectResponse(url="/login", status_code=302)
 
-    return await call_next(request)
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    if is_profiling_enabled() and request.query_params.get("profile"):
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        await call_next(request)
+        profiler.stop()
+        return HTMLResponse(profiler.output_html())
+
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        request_stats.reset(token)
+        observe_request(request.method, route_name(request), status, time.perf_counter() - start, stats)
+
+
+def route_name(request: Request) -> str:
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    if request.url.path.startswith("/static"):
+        return "/static"
+    return "unmatched"
 
 
 @app.get("/register")
@@ -112,6 +213,15 @@ def login(login_id: str = Form(),
     return response
 
 
+@app.get("/logout")
+def logout(request: Request,
+           session: Session = Depends(session)):
+    user_repository.logout(session, request.cookies["session_id"])
+    response = RedirectResponse(url="/login", status_code=302)
+    response.delete_cookie(key="session_id")
+    return response
+
+
 @app.get("/")
 def home(request: Request,
          user_id: Annotated[int | None, Header()],
@@ -139,14 +249,17 @@ def add_friend(user_id: Annotated[int | None, Header()],
 @app.get("/users")
 def search_users(user_id: Annotated[int | None, Header()],
                  query: str = "",
+                 limit: Annotated[int, Query(ge=1, le=100)] = 20,
+                 offset: Annotated[int, Query(ge=0)] = 0,
                  session: Session = Depends(session)):
-    users = user_repository.find_by_name(session, query)
     user = user_repository.find_by_id(session, user_id)
-    friends = user_repository.find_friends(session, user)
-    if user in users:
-        users.remove(user)
-    users = sorted(list(map(lambda x: {"user": x, "is_friend": x in friends}, users)), key=lambda x: x["is_friend"])
-    return JSONResponse({"result": jsonable_encoder(users)})
+    users = user_repository.find_by_name(session, query, limit + 1, offset, exclude_id=user.id)
+    has_more = len(users) > limit
+    users = users[:limit]
+    friend_ids = user_repository.find_friend_ids(session, user, [x.id for x in users])
+    result = sorted([{"user": {"id": x.id, "name": x.name}, "is_friend": x.id in friend_ids} for x in users],
+                    key=lambda x: x["is_friend"])
+    return JSONResponse({"result": result, "has_more": has_more})
 
 
 @app.get("/chatrooms")
@@ -154,12 +267,14 @@ def get_chatrooms(request: Request,
                   user_id: Annotated[int | None, Header()],
                   session: Session = Depends(session)):
     user = user_repository.find_by_id(session, user_id)
-    chatrooms = chatroom_repository.find_by_user(session, user)
+    memberships = chatroom_repository.find_memberships_by_user(session, user)
     chatroom_list = []
-    for chatroom in chatrooms:
-        recent_chat = chat_repository.find_recent_chat(session, chatroom)
+    for membership in memberships:
+        chatroom = membership.chatroom
+        recent_chat = chatroom.last_chat
         info = jsonable_encoder(chatroom)
-        info["name"] = get_chatroom_name(chatroom, user)
+        info["name"] = get_chatroom_name(chatroom, membership)
+        info["unread_count"] = membership.unread_count
 
         if recent_chat:
             time = recent_chat.date_time()
@@ -178,8 +293,6 @@ def get_chatrooms(request: Request,
             info["recent_chat"] = None
 
         chatroom_list.append(info)
-    print(chatroom_list)
-    chatroom_list.sort(key=lambda x: -mktime(x["recent_chat"]["time"].timetuple()) if x["recent_chat"] else -1)
     return templates.TemplateResponse("chatroom_list.html",
                                       {"request": request, "chatrooms": chatroom_list, "tab": "chat"})
 
@@ -192,6 +305,9 @@ def parse_time(date):
     return f'{a} {hour}:{minute:0>2}'
 
 
+templates.env.filters["chat_time"] = lambda time: parse_time(datetime.fromisoformat(time))
+
+
 @app.get("/chatrooms/{chatroom_id}")
 def get_chatroom(request: Request,
                  user_id: Annotated[int | None, Header()],
@@ -199,9 +315,16 @@ def get_chatroom(request: Request,
                  session: Session = Depends(session)):
     user = user_repository.find_by_id(session, user_id)
     chatroom = chatroom_repository.find_by_id(session, chatroom_id)
+    chatroom_repository.mark_read(session, chatroom.id, user.id)
+    membership = chatroom_repository.find_membership(session, chatroom.id, user.id)
+    chats, has_more = chat_repository.find_chats_page(session, chatroom)
     info = jsonable_encoder(chatroom)
-    info["name"] = get_chatroom_name(chatroom, user)
-    return templates.TemplateResponse("chatroom.html", {"request": request, "chatroom": info})
+    info["name"] = get_chatroom_name(chatroom, membership)
+    return templates.TemplateResponse("chatroom.html",
+                                      {"request": request, "chatroom": info, "login_user": user.id,
+                                       "chats": [chat_payload(chat) for chat in chats], "has_more": has_more,
+                                       "before": chat_repository.to_cursor(chats[0]) if chats else None,
+                                       "last_seq": chats[-1].seq or 0 if chats else 0})
 
 
 @app.get("/single-chats/{friend_id}")
@@ -225,16 +348,15 @@ def create_group_chat_form(request: Request,
 
 class CreateGroupChatRequest(SQLModel):
     name: str | None
-    member_ids: list | None
+    member_ids: list[int] | None
 
 
 @app.post("/groupchat")
 def create_group_chat(user_id: Annotated[int | None, Header()],
                       dto: CreateGroupChatRequest,
                       session: Session = Depends(session)):
-    print(dto)
     user = user_repository.find_by_id(session, user_id)
-    members = list(map(lambda x: user_repository.find_by_id(session, x), dto.member_ids))
+    members = user_repository.find_by_ids(session, dto.member_ids)
     chatroom = chatroom_repository.create_chatroom(session, members + [user], dto.name)
     return JSONResponse({"chatroom_id": chatroom.id, "redirect_url": "/chatrooms/" + str(chatroom.id)})
 
@@ -242,69 +364,271 @@ def create_group_chat(user_id: Annotated[int | None, Header()],
 @app.get("/chatrooms/{chatroom_id}/chats")
 def get_chats(user_id: Annotated[int | None, Header()],
               chatroom_id: Annotated[int | None, Path()],
+              before: str | None = None,
+              after: str | None = None,
+              limit: Annotated[int, Query(ge=1, le=200)] = 50,
               session: Session = Depends(session)):
     user = user_repository.find_by_id(session, user_id)
     chatroom = chatroom_repository.find_by_id(session, chatroom_id)
-    chats = chat_repository.find_chats_by_chatroom(session, chatroom)
-    chat_list = []
-    for chat in chats:
-        chat_type = chat.chat_type()
-        c = jsonable_encoder(chat)
-        c["chat_type"] = chat_type
-        c['writer'] = user_repository.find_by_id(session, c['writer_id'])
+    chats, has_more = chat_repository.find_chats_page(session, chatroom, before, after, limit)
+    return JSONResponse({"login_user": user.id,
+                         "chatroom_id": chatroom.id,
+                         "chats": [chat_payload(chat) for chat in chats],
+                         "has_more": has_more,
+                         "before": chat_repository.to_cursor(chats[0]) if chats else before,
+                         "after": chat_repository.to_cursor(chats[-1]) if chats else after})
+
+
+def create_chats(batch: list) -> list:
+    with Session(engine, expire_on_commit=False) as session:
+        chats = [build_chat(session, data) for data in batch]
+        chat_repository.save_all(session, [chat for chat in chats if chat])
+        return [chat_payload(chat) if chat else None for chat in chats]
+
+
+def is_valid_chat(data) -> bool:
+    if not isinstance(data.get("writer_id"), int) or not isinstance(data.get("chatroom_id"), int):
+        return False
+    if data.get("chat_type") == "text":
+        return isinstance(data.get("text"), str)
+    if data.get("chat_type") == "image":
+        return isinstance(data.get("image_id"), int) and isinstance(data.get("name", ""), str)
+    return False
+
+
+def is_valid_action(data) -> bool:
+    if not isinstance(data.get("chatroom_id"), int):
+        return False
+    last_seq = data.get("last_seq")
+    return last_seq is None or isinstance(last_seq, int) and last_seq >= 0
+
 
-        if chat_type == "image" or chat_type == "video":
-            image = image_repository.find_by_id(session, c['image_id'])
-            c['image'] = jsonable_encoder(image)
+def build_chat(session: Session, data):
+    if not is_valid_chat(data):
+        return None
 
-        chat_list.append(c)
-    return JSONResponse({"login_user": user.id, "chatroom_id": chatroom.id, "chats": jsonable_encoder(chat_list)})
+    chat_type = data["chat_type"]
+    writer = user_repository.find_by_id(session, data["writer_id"])
+    chatroom = chatroom_repository.find_by_id(session, data["chatroom_id"])
+    if not writer or not chatroom:
+        return None
+
+    if chat_type == "text":
+        return chat_repository.new_text_chat(chatroom, writer, data["text"])
+
+    elif chat_type == "image":
+        image = image_repository.find_by_id(session, data['image_id'])
+        if not image:
+            return None
+        return chat_repository.new_image_chat(chatroom, writer, image, data.get("name"))
+
+
+def chat_payload(chat):
+    chat_type = chat.chat_type()
+    payload = {"id": chat.id, "chatroom_id": chat.chatroom_id, "seq": chat.seq, "time": chat.time,
+               "chat_type": chat_type, "writer": {"id": chat.writer.id, "name": chat.writer.name}}
+
+    if chat_type == "text":
+        payload["text"] = chat.text
+    else:
+        payload["image"] = {"id": chat.image.id, "name": chat.file_name or chat.image.name,
+                            "image_name": chat.image.image_name,
+                            "thumbnail_name": chat.image.thumbnail_name}
+    return payload
+
+
+chat_pipeline = ChatPipeline(create_chats, manager.broadcast,
+                             max_batch_size=int(os.environ.get("CHAT_BATCH_SIZE", 100)),
+                             max_delay=float(os.environ.get("CHAT_BATCH_DELAY_MS", 5)) / 1000)
+
+
+@app.on_event("startup")
+async def start_chat_pipeline():
+    await chat_pipeline.start()
+
+
+@app.on_event("shutdown")
+async def stop_chat_pipeline():
+    await chat_pipeline.stop()
+
+
+def find_resync_chats(chatroom_id: int, last_seq: int):
+    with Session(engine) as session:
+        chats, has_more = chat_repository.find_chats_after_seq(session, chatroom_id, last_seq,
+                                                               int(os.environ.get("RESYNC_MAX_GAP", 200)))
+        return [(chat.seq, encode(chat_payload(chat))) for chat in chats], has_more
+
+
+async def load_resync_chats(chatroom_id: int, last_seq: int):
+    return await run_in_threadpool(find_resync_chats, chatroom_id, last_seq)
+
+
+async def subscribe(ws: WebSocket, chatroom_id: int, last_seq: int | None):
+    if last_seq is None:
+        manager.subscribe(ws, chatroom_id)
+    else:
+        await manager.resume(ws, chatroom_id, last_seq, load_resync_chats)
+
+
+async def find_ws_user_id(ws: WebSocket, session: Session) -> int | None:
+    session_id = ws.cookies.get("session_id")
+    if session_id is None:
+        return None
+    user_id = session_cache.get(session_id)
+    if user_id is None:
+        try:
+            user_id = await run_in_threadpool(user_repository.find_user_id_by_session_id, session, session_id)
+        except SessionNotFoundException as e:
+            logger.debug("%s", e)
+            return None
+    return user_id
+
+
+def is_member(chatroom_id: int, user_id: int) -> bool:
+    with Session(engine) as session:
+        return chatroom_repository.find_membership(session, chatroom_id, user_id) is not None
+
+
+def mark_read(chatroom_id: int, user_id: int):
+    with Session(engine) as session:
+        chatroom_repository.mark_read(session, chatroom_id, user_id)
+
+
+async def check_membership(ws: WebSocket, memberships: set, chatroom_id, user_id: int) -> bool:
+    if chatroom_id not in memberships:
+        if not isinstance(chatroom_id, int) or not await run_in_threadpool(is_member, chatroom_id, user_id):
+            logger.info("참여하지 않은 채팅방 접근: user_id=%s, chatroom_id=%s", user_id, chatroom_id)
+            manager.send(ws, {"error": "참여하지 않은 채팅방입니다."})
+            return False
+        memberships.add(chatroom_id)
+    return True
+
+
+def send_ack(ws: WebSocket, client_id, future: asyncio.Future):
+    chat = None if future.cancelled() else future.result()
+    if chat is None:
+        manager.send(ws, {"error": "채팅을 저장하지 못했습니다.", "client_id": client_id})
+    else:
+        manager.send(ws, {"ack": {"id": chat["id"], "chatroom_id": chat["chatroom_id"], "seq": chat["seq"],
+                                  "client_id": client_id}})
+
+
+async def handle_action(ws: WebSocket, memberships: set, action: str, data, user_id: int):
+    if not is_valid_action(data):
+        logger.info("잘못된 웹소켓 메시지: %s", data)
+        manager.send(ws, {"error": "잘못된 메시지입니다."})
+        return
+
+    chatroom_id = data["chatroom_id"]
+    if action == "unsubscribe":
+        manager.unsubscribe(ws, chatroom_id)
+    elif await check_membership(ws, memberships, chatroom_id, user_id):
+        if action == "subscribe":
+            await subscribe(ws, chatroom_id, data.get("last_seq"))
+        else:
+            await run_in_threadpool(mark_read, chatroom_id, user_id)
 
 
 @app.websocket("/ws/connect")
-async def ws_connect(ws: WebSocket, session: Session = Depends(session)):
+async def ws_connect(ws: WebSocket,
+                     chatroom_id: int | None = None,
+                     last_seq: int | None = None,
+                     session: Session = Depends(session)):
+    user_id = await find_ws_user_id(ws, session)
+    session.close()
+    if user_id is None:
+        await ws.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    memberships = set()
     await manager.connect(ws)
     try:
+        if chatroom_id is not None and await check_membership(ws, memberships, chatroom_id, user_id):
+            await subscribe(ws, chatroom_id, last_seq)
         while True:
-            data = await ws.receive_json()
-            chat_type = data["chat_type"]
-            writer = user_repository.find_by_id(session, data["writer_id"])
-            chatroom = chatroom_repository.find_by_id(session, data["chatroom_id"])
-
-            if chat_type == "text":
-                chat = jsonable_encoder(chat_repository.create_text_chat(session, chatroom, writer, data["text"]))
-                chat['writer'] = user_repository.find_by_id(session, writer.id)
-                chat['chat_type'] = 'text'
-                await manager.broadcast(jsonable_encoder(chat))
-
-            elif chat_type == "image":
-                image_id = data['image_id']
-                image = image_repository.find_by_id(session, image_id)
-                encoded_image = jsonable_encoder(image)
-                chat = jsonable_encoder(chat_repository.create_image_chat(session, chatroom, writer, image))
-                chat['writer'] = user_repository.find_by_id(session, writer.id)
-                chat['image'] = encoded_image
-                chat['chat_type'] = encoded_image["image_type"]
-                print(f'{chat=}')
-                await manager.broadcast(jsonable_encoder(chat))
+            data = await manager.receive(ws)
+            if not isinstance(data, dict):
+                logger.info("잘못된 웹소켓 메시지: %s", data)
+                manager.send(ws, {"error": "잘못된 메시지입니다."})
+                continue
+            action = data.get("action")
+            if action in ("subscribe", "unsubscribe", "read"):
+                await handle_action(ws, memberships, action, data, user_id)
+                continue
+
+            data["writer_id"] = user_id
+            if not is_valid_chat(data):
+                logger.info("잘못된 채팅 메시지: %s", data)
+                manager.send(ws, {"error": "잘못된 채팅 메시지입니다."})
+                continue
+            if not await check_membership(ws, memberships, data["chatroom_id"], user_id):
+                continue
+
+            future = await chat_pipeline.submit(data)
+            future.add_done_callback(partial(send_ack, ws, data.get("client_id")))
 
     except WebSocketDisconnect as e:
-        print(e)
+        logger.debug("웹소켓 연결 종료: code=%s", e.code)
     finally:
         await manager.disconnect(ws)
 
 
+registry.gauge("websocket_connections", "Open WebSocket connections.", lambda: len(manager.connections))
+registry.gauge("websocket_rooms", "Chat rooms with at least one subscriber.", lambda: len(manager.rooms))
+registry.gauge("websocket_queue_depth", "Messages waiting in WebSocket send queues.",
+               lambda: sum(connection.queue.qsize() for connection in manager.connections.values()))
+registry.callback_counter("websocket_connections_opened_total", "WebSocket connections accepted.",
+                          lambda: manager.opened_connections)
+registry.callback_counter("websocket_connections_evicted_total", "Slow WebSocket connections closed.",
+                          lambda: manager.evicted_connections)
+registry.callback_counter("websocket_messages_received_total", "WebSocket messages received from clients.",
+                          lambda: manager.received_messages)
+registry.callback_counter("websocket_messages_sent_total", "WebSocket messages sent to clients.",
+                          lambda: manager.sent_messages)
+registry.callback_counter("chat_batches_total", "Chat write batches committed.", lambda: chat_pipeline.batches)
+registry.callback_counter("chat_messages_total", "Chats committed through the write pipeline.",
+                          lambda: chat_pipeline.messages)
+registry.callback_counter("session_cache_hits_total", "Session cache hits.", lambda: session_cache.hits)
+registry.callback_counter("session_cache_misses_total", "Session cache misses.", lambda: session_cache.misses)
+registry.callback_counter("friend_cache_hits_total", "Friend cache hits.", lambda: friend_cache.hits)
+registry.callback_counter("friend_cache_misses_total", "Friend cache misses.", lambda: friend_cache.misses)
+
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.on_event("shutdown")
+def stop_thumbnail_generator():
+    thumbnail_generator.shutdown()
+
+
+async def create_thumbnail(image: Image):
+    thumbnail_name = await image_repository.create_thumbnail("./static", image)
+    if thumbnail_name is None:
+        return
+    with Session(engine) as session:
+        await run_in_threadpool(image_repository.update_thumbnail, session, image.id, thumbnail_name)
+
+
 @app.post("/images")
-async def upload_image(file: UploadFile,
+async def upload_image(request: Request,
+                       background_tasks: BackgroundTasks,
                        session: Session = Depends(session)):
+    file = MultipartUpload(request, image_repository.MAX_UPLOAD_SIZE)
     image = await image_repository.create(session, file, "./static")
-    return JSONResponse(jsonable_encoder(image))
+    if image.thumbnail_name is None:
+        background_tasks.add_task(create_thumbnail, image)
+    return JSONResponse({**jsonable_encoder(image), "name": file.filename})
 
 
 @app.get("/images/{image_name}")
-async def download_image(image_name: Annotated[str | None, Path()]):
-    return FileResponse("./static/image/" + image_name)
+async def download_image(request: Request,
+                         image_name: Annotated[str | None, Path()]):
+    return await media_response(request, image_repository.get_path("./static", image_name))
 
 
 if __name__ == "__main__":
-    uvicorn.run(app)
+    uvicorn.run(app, ws="websockets" if websockets is not None else "auto",
+                ws_per_message_deflate=os.environ.get("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true")
@@ -1,39 +1,109 @@
 from datetime import datetime
 
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
-from domain.chat import TextChat, ImageChat
-from domain.chat_room import ChatRoom
+from domain.chat import Chat
+from domain.chat_room import ChatRoom, ChatRoomMember
 from domain.image import Image
 from domain.user import User
+from util.user_exceptions import InvalidCursorException
 
 
 def create_text_chat(session: Session, chatroom: ChatRoom, writer: User, text: str):
-    chat = TextChat(time=datetime.now().isoformat(), chatroom=chatroom, writer=writer, text=text)
-    session.add(chat)
+    return save(session, new_text_chat(chatroom, writer, text))
+
+
+def new_text_chat(chatroom: ChatRoom, writer: User, text: str) -> Chat:
+    return Chat(time=datetime.now().isoformat(), chatroom=chatroom, writer=writer, text=text)
+
+
+def new_image_chat(chatroom: ChatRoom, writer: User, image: Image, file_name: str | None = None) -> Chat:
+    return Chat(time=datetime.now().isoformat(), chatroom=chatroom, writer=writer, image=image,
+                file_name=file_name or image.name)
+
+
+def save(session: Session, chat: Chat):
+    add(session, chat)
     session.commit()
     session.refresh(chat)
     return chat
 
 
-def create_image_chat(session: Session, chatroom: ChatRoom, writer: User, image: Image):
-    chat = ImageChat(time=datetime.now().isoformat(), chatroom=chatroom, writer=writer, image=image)
-    session.add(chat)
+def save_all(session: Session, chats: list) -> list:
+    for chat in chats:
+        add(session, chat)
     session.commit()
-    session.refresh(chat)
-    return chat
+    return chats
+
+
+def add(session: Session, chat: Chat):
+    chatroom_id = chat.chatroom.id if chat.chatroom else chat.chatroom_id
+    chat.seq = session.execute(update(ChatRoom)
+                               .where(ChatRoom.id == chatroom_id)
+                               .values(last_seq=ChatRoom.last_seq + 1)
+                               .returning(ChatRoom.last_seq)).scalar_one()
+    session.add(chat)
+    session.flush()
+    session.execute(update(ChatRoom)
+                    .where(ChatRoom.id == chat.chatroom_id)
+                    .where(or_(ChatRoom.last_chat_time == None, ChatRoom.last_chat_time <= chat.time))  # noqa: E711
+                    .values(last_chat_id=chat.id, last_chat_time=chat.time))
+    session.execute(update(ChatRoomMember)
+                    .where(ChatRoomMember.chatroom_id == chat.chatroom_id)
+                    .where(ChatRoomMember.member_id != chat.writer_id)
+                    .values(unread_count=ChatRoomMember.unread_count + 1))
 
 
 def time_string():
     return ("오전" if datetime.now().strftime("%p") == "AM" else "오후") + datetime.now().strftime(" %I:%M")
 
 
-def find_chats_by_chatroom(session: Session, chatroom: ChatRoom):
-    textchats = list(session.exec(select(TextChat).where(TextChat.chatroom == chatroom)).all())
-    imagechats = list(session.exec(select(ImageChat).where(ImageChat.chatroom == chatroom)).all())
-    return sorted(textchats + imagechats, key=lambda x: x.date_time())
+def find_recent_chat(session: Session, chatroom: ChatRoom):
+    statement = select(Chat).where(Chat.chatroom_id == chatroom.id).order_by(Chat.time.desc(), Chat.id.desc())
+    return session.exec(statement.limit(1)).first()
+
 
+def find_chats_page(session: Session, chatroom: ChatRoom,
+                    before: str | None = None, after: str | None = None, limit: int = 50):
+    statement = (select(Chat)
+                 .where(Chat.chatroom_id == chatroom.id)
+                 .options(selectinload(Chat.writer), selectinload(Chat.image)))
+    if after:
+        time, chat_id = parse_cursor(after)
+        statement = statement.where(or_(Chat.time > time, and_(Chat.time == time, Chat.id > chat_id)))
+        statement = statement.order_by(Chat.time, Chat.id)
+    else:
+        if before:
+            time, chat_id = parse_cursor(before)
+            statement = statement.where(or_(Chat.time < time, and_(Chat.time == time, Chat.id < chat_id)))
+        statement = statement.order_by(Chat.time.desc(), Chat.id.desc())
 
-def find_recent_chat(session: Session, chatroom: ChatRoom):
-    chats = find_chats_by_chatroom(session, chatroom)
-    return chats[-1] if chats else None
+    chats = list(session.exec(statement.limit(limit + 1)).all())
+    has_more = len(chats) > limit
+    chats = chats[:limit]
+    return (chats if after else list(reversed(chats))), has_more
+
+
+def find_chats_after_seq(session: Session, chatroom_id: int, seq: int, limit: int = 200):
+    statement = (select(Chat)
+                 .where(Chat.chatroom_id == chatroom_id)
+                 .where(Chat.seq > seq)
+                 .options(selectinload(Chat.writer), selectinload(Chat.image))
+                 .order_by(Chat.seq)
+                 .limit(limit + 1))
+    chats = list(session.exec(statement).all())
+    return chats[:limit], len(chats) > limit
+
+
+def to_cursor(chat) -> str:
+    return f'{chat.time}_{chat.id}'
+
+
+def parse_cursor(cursor: str):
+    try:
+        time, chat_id = cursor.rsplit("_", 1)
+        return time, int(chat_id)
+    except ValueError:
+        raise InvalidCursorException(cursor)
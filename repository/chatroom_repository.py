@@ -1,46 +1,92 @@
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select
 
+from domain.chat import Chat
 from domain.chat_room import ChatRoom, ChatRoomMember
 from domain.user import User
 
 
-def create_chatroom(session: Session, members: list, name: str = "") -> ChatRoom:
-    chatroom = ChatRoom(name=name)
+def create_chatroom(session: Session, members: list, name: str = "", direct_key: str | None = None) -> ChatRoom:
+    chatroom = ChatRoom(name=name, direct_key=direct_key)
     session.add(chatroom)
-    for member in members:
-        user = ChatRoomMember(chatroom=chatroom, member=member)
-        session.add(user)
+    session.flush()
+    member_ids = list(dict.fromkeys(member.id for member in members))
+    session.execute(insert(ChatRoomMember),
+                    [{"chatroom_id": chatroom.id, "member_id": member_id} for member_id in member_ids])
+    update_display_names(session, chatroom.id)
     session.commit()
     session.refresh(chatroom)
     return chatroom
 
 
-def find_by_user(session: Session, user: User) -> list:
-    chatroom_members = session.exec(select(ChatRoomMember).where(ChatRoomMember.member == user)).all()
-    return list(map(lambda x: x.chatroom, chatroom_members))
+def update_display_names(session: Session, chatroom_id: int):
+    rows = session.exec(select(ChatRoomMember.id, User.id, User.name)
+                        .join(User, User.id == ChatRoomMember.member_id)
+                        .where(ChatRoomMember.chatroom_id == chatroom_id)
+                        .order_by(ChatRoomMember.id)).all()
+    session.execute(update(ChatRoomMember),
+                    [{"id": membership_id, "display_name": get_display_name(rows, member_id)}
+                     for membership_id, member_id, _ in rows])
+
+
+def get_display_name(rows: list, viewer_id: int) -> str:
+    return ", ".join(name for _, member_id, name in rows if member_id != viewer_id)
+
+
+def find_memberships_by_user(session: Session, user: User) -> list:
+    statement = (select(ChatRoomMember)
+                 .join(ChatRoom)
+                 .where(ChatRoomMember.member_id == user.id)
+                 .order_by(ChatRoom.last_chat_time.desc(), ChatRoom.id.desc())
+                 .options(joinedload(ChatRoomMember.chatroom).joinedload(ChatRoom.last_chat).joinedload(Chat.image)))
+    return list(session.exec(statement).all())
+
+
+def mark_read(session: Session, chatroom_id: int, user_id: int):
+    chatroom = find_by_id(session, chatroom_id)
+    if chatroom is None:
+        return
+    session.execute(update(ChatRoomMember)
+                    .where(ChatRoomMember.chatroom_id == chatroom_id)
+                    .where(ChatRoomMember.member_id == user_id)
+                    .values(unread_count=0, last_read_chat_id=chatroom.last_chat_id))
+    session.commit()
 
 
 def get_single_chat(session: Session, user: User, other: User) -> ChatRoom:
-    chatrooms = list(session.exec(select(ChatRoom)).all())
-    for chatroom in chatrooms:
-        chatroom_members = list(map(lambda x: x.member, chatroom.members))
-        if len(chatroom_members) != 2:
-            continue
+    key = get_direct_key(user.id, other.id)
+    chatroom = find_by_direct_key(session, key)
+    if chatroom:
+        return chatroom
 
-        if user in chatroom_members and other in chatroom_members:
-            return chatroom
+    try:
+        return create_chatroom(session, [user, other], direct_key=key)
+    except IntegrityError:
+        session.rollback()
+        return find_by_direct_key(session, key)
 
-    return create_chatroom(session, [user, other])
+
+def get_direct_key(user_id: int, other_id: int) -> str:
+    return f'{min(user_id, other_id)}:{max(user_id, other_id)}'
+
+
+def find_by_direct_key(session: Session, direct_key: str):
+    return session.exec(select(ChatRoom).where(ChatRoom.direct_key == direct_key)).first()
 
 
 def find_by_id(session: Session, chatroom_id: int):
     return session.exec(select(ChatRoom).where(ChatRoom.id == chatroom_id)).first()
 
 
-def get_chatroom_name(chatroom: ChatRoom, user: User):
+def find_membership(session: Session, chatroom_id: int, user_id: int):
+    return session.exec(select(ChatRoomMember)
+                        .where(ChatRoomMember.chatroom_id == chatroom_id)
+                        .where(ChatRoomMember.member_id == user_id)).first()
+
+
+def get_chatroom_name(chatroom: ChatRoom, membership: ChatRoomMember):
     if chatroom.name:
         return chatroom.name
-
-    members = list(map(lambda x: x.member, chatroom.members))
-    members.remove(user)
-    return ", ".join(map(lambda x: x.name, members))
+    return membership.display_name or ""
@@ -1,37 +1,101 @@
+import hashlib
+import logging
 import os
 from uuid import uuid4 as uuid
 
-from fastapi import UploadFile
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
 from domain.image import Image
+from util.multipart_upload import MultipartUpload
+from util.thumbnail import thumbnail_generator
+from util.user_exceptions import UploadTooLargeException
 
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))
 
-async def create(session: Session, file: UploadFile, base_dir: str):
+logger = logging.getLogger(__name__)
+
+
+async def create(session: Session, file: MultipartUpload, base_dir: str):
     image_path = base_dir + "/image"
     create_dir(image_path)
 
-    content = await file.read()
-    ext = parse_ext(file.content_type)
+    temp_path = os.path.join(image_path, str(uuid()) + ".tmp")
+    size, content_hash = await write_file(file, temp_path)
+
+    image = await run_in_threadpool(find_by_content_hash, session, content_hash)
+    if image:
+        os.remove(temp_path)
+        return image
+
+    image_name = content_hash + parse_ext(file.content_type)
+    path = get_path(base_dir, image_name)
+    create_dir(os.path.dirname(path))
+    os.replace(temp_path, path)
+
+    image = Image(name=file.filename, image_name=image_name, image_type=get_type(file.content_type),
+                  content_hash=content_hash, size=size)
+    return await run_in_threadpool(save, session, image)
 
-    image_name = str(uuid()) + ext
 
-    with open(os.path.join(image_path, image_name), "wb") as fp:
-        fp.write(content)
+async def create_thumbnail(base_dir: str, image: Image):
+    thumbnail_name = image.content_hash + "_thumbnail.jpg"
+    if not await thumbnail_generator.create(get_path(base_dir, image.image_name),
+                                            get_path(base_dir, thumbnail_name), image.image_type):
+        return None
+    return thumbnail_name
 
-    image = Image(name=file.filename, image_name=image_name, image_type=get_type(file.content_type))
+
+def save(session: Session, image: Image):
     session.add(image)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        return find_by_content_hash(session, image.content_hash)
     session.refresh(image)
     return image
 
 
+def update_thumbnail(session: Session, image_id: int, thumbnail_name: str):
+    session.execute(update(Image).where(Image.id == image_id).values(thumbnail_name=thumbnail_name))
+    session.commit()
+
+
+def get_path(base_dir: str, image_name: str):
+    content_hash = image_name.split(".")[0].split("_")[0]
+    if len(content_hash) != 64:
+        return os.path.join(base_dir, "image", image_name)
+    return os.path.join(base_dir, "image", content_hash[:2], content_hash[2:4], image_name)
+
+
+async def write_file(file: MultipartUpload, path: str, max_size: int = MAX_UPLOAD_SIZE):
+    size = 0
+    digest = hashlib.sha256()
+    fp = await run_in_threadpool(open, path, "wb")
+    try:
+        async for chunk in file.stream():
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeException(file.filename, max_size)
+            digest.update(chunk)
+            await run_in_threadpool(fp.write, chunk)
+    except BaseException:
+        await run_in_threadpool(fp.close)
+        os.remove(path)
+        raise
+    await run_in_threadpool(fp.close)
+    return size, digest.hexdigest()
+
+
 def create_dir(path):
     try:
         if not os.path.exists(path):
             os.makedirs(path)
-    except OSError:
-        print("폴더 생성 불가")
+    except OSError as e:
+        logger.error("폴더 생성 불가: %s %s", path, e)
 
 
 def parse_ext(content_type):
@@ -44,3 +108,7 @@ def get_type(content_type):
 
 def find_by_id(session: Session, image_id: int):
     return session.exec(select(Image).where(Image.id == image_id)).first()
+
+
+def find_by_content_hash(session: Session, content_hash: str):
+    return session.exec(select(Image).where(Image.content_hash == content_hash)).first()
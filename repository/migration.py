@@ -0,0 +1,221 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(engine: Engine):
+    with engine.connect() as connection:
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        step(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+        logger.info("마이그레이션 %d 적용: %s", number, step.__name__)
+
+
+def merge_chat_tables(engine: Engine):
+    tables = set(inspect(engine).get_table_names())
+    legacy = [table for table in ("textchat", "imagechat") if table in tables]
+    if not legacy:
+        return
+
+    selects = {
+        "textchat": "SELECT chatroom_id, writer_id, time, text, NULL AS image_id FROM textchat",
+        "imagechat": "SELECT chatroom_id, writer_id, time, NULL AS text, image_id FROM imagechat",
+    }
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO chat (chatroom_id, writer_id, time, text, image_id) "
+            "SELECT chatroom_id, writer_id, time, text, image_id "
+            f"FROM ({' UNION ALL '.join(selects[table] for table in legacy)}) ORDER BY time"
+        ))
+        for table in legacy:
+            connection.execute(text(f"DROP TABLE {table}"))
+    logger.info("채팅 테이블 마이그레이션 완료: %s", ", ".join(legacy))
+
+
+def add_chatroom_summary(engine: Engine):
+    with engine.begin() as connection:
+        if add_columns(connection, "chatroom", ["last_chat_id INTEGER", "last_chat_time VARCHAR"]):
+            connection.execute(text(
+                "UPDATE chatroom SET "
+                "last_chat_id = (SELECT id FROM chat WHERE chat.chatroom_id = chatroom.id "
+                "ORDER BY time DESC, id DESC LIMIT 1), "
+                "last_chat_time = (SELECT time FROM chat WHERE chat.chatroom_id = chatroom.id "
+                "ORDER BY time DESC, id DESC LIMIT 1)"
+            ))
+        add_columns(connection, "chatroommember",
+                    ["unread_count INTEGER NOT NULL DEFAULT 0", "last_read_chat_id INTEGER"])
+
+
+def add_direct_key(engine: Engine):
+    with engine.begin() as connection:
+        if not add_columns(connection, "chatroom", ["direct_key VARCHAR"]):
+            return
+
+        rows = connection.execute(text(
+            "SELECT chatroom.id, MIN(member_id), MAX(member_id) FROM chatroom "
+            "JOIN chatroommember ON chatroommember.chatroom_id = chatroom.id "
+            "WHERE chatroom.name = '' GROUP BY chatroom.id HAVING COUNT(*) = 2 ORDER BY chatroom.id"
+        )).all()
+        keys = {}
+        for chatroom_id, user_id, other_id in rows:
+            keys.setdefault(f'{user_id}:{other_id}', chatroom_id)
+        if keys:
+            connection.execute(text("UPDATE chatroom SET direct_key = :key WHERE id = :id"),
+                               [{"key": key, "id": chatroom_id} for key, chatroom_id in keys.items()])
+
+
+def add_image_metadata(engine: Engine):
+    with engine.begin() as connection:
+        add_columns(connection, "image", ["content_hash VARCHAR", "size INTEGER", "thumbnail_name VARCHAR"])
+        if not add_columns(connection, "image", ["ref_count INTEGER NOT NULL DEFAULT 1"]):
+            return
+
+        duplicates = connection.execute(text(
+            "SELECT content_hash, MIN(id), COUNT(*) FROM image "
+            "WHERE content_hash IS NOT NULL GROUP BY content_hash HAVING COUNT(*) > 1"
+        )).all()
+        for content_hash, image_id, count in duplicates:
+            params = {"content_hash": content_hash, "id": image_id, "count": count}
+            connection.execute(text(
+                "UPDATE chat SET image_id = :id WHERE image_id IN "
+                "(SELECT id FROM image WHERE content_hash = :content_hash AND id != :id)"
+            ), params)
+            connection.execute(text("DELETE FROM image WHERE content_hash = :content_hash AND id != :id"), params)
+            connection.execute(text("UPDATE image SET ref_count = :count WHERE id = :id"), params)
+
+
+def add_chat_seq(engine: Engine):
+    with engine.begin() as connection:
+        add_columns(connection, "chat", ["seq INTEGER"])
+        if not add_columns(connection, "chatroom", ["last_seq INTEGER NOT NULL DEFAULT 0"]):
+            return
+
+        connection.execute(text(
+            "UPDATE chat SET seq = numbered.seq FROM "
+            "(SELECT id, ROW_NUMBER() OVER (PARTITION BY chatroom_id ORDER BY time, id) AS seq FROM chat) "
+            "AS numbered WHERE chat.id = numbered.id"
+        ))
+        connection.execute(text(
+            "UPDATE chatroom SET last_seq = COALESCE((SELECT MAX(seq) FROM chat WHERE chat.chatroom_id = chatroom.id), 0)"
+        ))
+
+
+def add_user_search_index(engine: Engine):
+    if "user_name_fts" in inspect(engine).get_table_names():
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE user_name_fts USING fts5(name, content='user', content_rowid='id', tokenize='trigram')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER user_name_fts_insert AFTER INSERT ON user BEGIN "
+            "INSERT INTO user_name_fts (rowid, name) VALUES (new.id, new.name); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER user_name_fts_delete AFTER DELETE ON user BEGIN "
+            "INSERT INTO user_name_fts (user_name_fts, rowid, name) VALUES ('delete', old.id, old.name); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER user_name_fts_update AFTER UPDATE OF name ON user BEGIN "
+            "INSERT INTO user_name_fts (user_name_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+            "INSERT INTO user_name_fts (rowid, name) VALUES (new.id, new.name); END"
+        ))
+        connection.execute(text("INSERT INTO user_name_fts (user_name_fts) VALUES ('rebuild')"))
+    logger.info("유저 검색 인덱스 생성 완료")
+
+
+def add_lookup_indexes(engine: Engine):
+    with engine.begin() as connection:
+        duplicated = connection.execute(text(
+            "SELECT login_id FROM user GROUP BY login_id HAVING COUNT(*) > 1"
+        )).scalars().all()
+        if duplicated:
+            raise RuntimeError(f"중복된 Login Id가 존재하여 인덱스를 생성할 수 없습니다. Login ID: {', '.join(duplicated)}")
+
+        remove_duplicates(connection, "chatroommember", ["chatroom_id", "member_id"])
+        remove_duplicates(connection, "friendrelation", ["user_id", "friend_id"])
+        remove_duplicates(connection, "usersession", ["session_id"])
+        for statement in [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_user_login_id ON user (login_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_usersession_session_id ON usersession (session_id)",
+            "CREATE INDEX IF NOT EXISTS ix_usersession_user_id ON usersession (user_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_friendrelation_user_id_friend_id ON friendrelation (user_id, friend_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_chatroommember_chatroom_id_member_id "
+            "ON chatroommember (chatroom_id, member_id)",
+            "CREATE INDEX IF NOT EXISTS ix_chatroommember_member_id ON chatroommember (member_id)",
+        ]:
+            connection.execute(text(statement))
+
+
+def add_member_display_name(engine: Engine):
+    with engine.begin() as connection:
+        if not add_columns(connection, "chatroommember", ["display_name VARCHAR"]):
+            return
+
+        rows = connection.execute(text(
+            "SELECT chatroommember.chatroom_id, chatroommember.id, user.id, user.name FROM chatroommember "
+            "JOIN user ON user.id = chatroommember.member_id ORDER BY chatroommember.chatroom_id, chatroommember.id"
+        )).all()
+        members = {}
+        for chatroom_id, membership_id, member_id, name in rows:
+            members.setdefault(chatroom_id, []).append((membership_id, member_id, name))
+        connection.execute(text("UPDATE chatroommember SET display_name = :display_name WHERE id = :id"), [
+            {"id": membership_id,
+             "display_name": ", ".join(name for _, other_id, name in room if other_id != member_id)}
+            for room in members.values() for membership_id, member_id, _ in room
+        ])
+
+
+def add_chat_file_name(engine: Engine):
+    with engine.begin() as connection:
+        if add_columns(connection, "chat", ["file_name VARCHAR"]):
+            connection.execute(text(
+                "UPDATE chat SET file_name = (SELECT name FROM image WHERE image.id = chat.image_id) "
+                "WHERE image_id IS NOT NULL"
+            ))
+
+
+def drop_image_ref_count(engine: Engine):
+    with engine.begin() as connection:
+        if "ref_count" in {column["name"] for column in inspect(connection).get_columns("image")}:
+            connection.execute(text("ALTER TABLE image DROP COLUMN ref_count"))
+            logger.info("image 테이블에서 컬럼 삭제: ref_count")
+
+
+def remove_duplicates(connection, table: str, columns: list):
+    result = connection.execute(text(
+        f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {', '.join(columns)})"
+    ))
+    if result.rowcount:
+        logger.info("%s 테이블의 중복 행 삭제: %d", table, result.rowcount)
+
+
+def add_columns(connection, table: str, columns: list) -> bool:
+    existing = {column["name"] for column in inspect(connection).get_columns(table)}
+    missing = [column for column in columns if column.split()[0] not in existing]
+    for column in missing:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}"))
+    if missing:
+        logger.info("%s 테이블에 컬럼 추가: %s", table, ", ".join(missing))
+    return bool(missing)
+
+
+MIGRATIONS = [
+    merge_chat_tables,
+    add_chatroom_summary,
+    add_direct_key,
+    add_image_metadata,
+    add_chat_seq,
+    add_user_search_index,
+    add_lookup_indexes,
+    add_member_display_name,
+    add_chat_file_name,
+    drop_image_ref_count,
+]
@@ -1,10 +1,14 @@
 from uuid import uuid4 as uuid
 
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from domain.friend_relation import FriendRelation
 from domain.user import User
 from domain.user_session import UserSession
+from util.friend_cache import friend_cache, FriendList
+from util.session_cache import session_cache
 from util.user_exceptions import SessionNotFoundException, LoginException, DuplicateUserException
 
 
@@ -18,7 +22,11 @@ def create(session: Session, name: str, login_id: str, password: str) -> User:
 
     user = User(name=name, login_id=login_id, password=password)
     session.add(user)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise DuplicateUserException(login_id)
     session.refresh(user)
     return user
 
@@ -31,6 +39,7 @@ def login(session: Session, login_id: str, password: str) -> User:
     if not user.session:
         user.session = UserSession(session_id=str(uuid()))
     else:
+        session_cache.invalidate(user.session.session_id)
         user.session.session_id = str(uuid())
     session.add(user)
     session.commit()
@@ -42,22 +51,78 @@ def find_by_id(session: Session, user_id: int) -> User:
     return session.exec(select(User).where(User.id == user_id)).first()
 
 
-def find_by_name(session: Session, user_name: str) -> list:
-    return list(session.exec(select(User).where(User.name.contains(user_name))).all())
+def find_by_ids(session: Session, user_ids: list) -> list:
+    users = {user.id: user for user in session.exec(select(User).where(User.id.in_(user_ids))).all()}
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+def find_by_name(session: Session, user_name: str, limit: int = 20, offset: int = 0,
+                 exclude_id: int | None = None) -> list:
+    user_name = user_name.strip()
+    if not user_name:
+        return []
+
+    if len(user_name) >= 3:
+        user_ids = session.execute(text(
+            "SELECT user.id FROM user_name_fts JOIN user ON user.id = user_name_fts.rowid "
+            "WHERE user_name_fts MATCH :phrase AND user.id IS NOT :exclude_id "
+            "ORDER BY user.name, user.id LIMIT :limit OFFSET :offset"
+        ), {"phrase": '"' + user_name.replace('"', '""') + '"', "exclude_id": exclude_id,
+            "limit": limit, "offset": offset}).scalars().all()
+        return find_by_ids(session, list(user_ids))
+
+    statement = select(User.id).where(User.name >= user_name, User.name < user_name + "\U0010ffff")
+    if exclude_id is not None:
+        statement = statement.where(User.id != exclude_id)
+    user_ids = session.exec(statement.order_by(User.name, User.id).offset(offset).limit(limit)).all()
+    return find_by_ids(session, list(user_ids))
+
+
+def find_user_id_by_session_id(session: Session, session_id: str) -> int:
+    user_id = find_session(session, session_id).user_id
+    session_cache.put(session_id, user_id)
+    return user_id
 
 
-def find_by_session_id(session: Session, session_id: str) -> User:
+def find_session(session: Session, session_id: str) -> UserSession:
     user_session = session.exec(select(UserSession).where(UserSession.session_id == session_id)).first()
     if not user_session:
         raise SessionNotFoundException(session_id)
-    return user_session.user
+    return user_session
+
+
+def logout(session: Session, session_id: str):
+    session_cache.invalidate(session_id)
+    user_session = session.exec(select(UserSession).where(UserSession.session_id == session_id)).first()
+    if user_session:
+        session.delete(user_session)
+        session.commit()
 
 
 def add_friend_relation(session: Session, user: User, friend: User):
-    session.add(FriendRelation(user=user, friend=friend))
-    session.commit()
+    session.add(FriendRelation(user_id=user.id, friend_id=friend.id))
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        return
+    friend_cache.add(user.id, friend.id, friend.name)
+
+
+def find_friend_ids(session: Session, user: User, user_ids: list) -> set:
+    friends = find_friend_list(session, user)
+    return {user_id for user_id in user_ids if user_id in friends}
 
 
 def find_friends(session: Session, user: User) -> list:
-    friends = session.exec(select(FriendRelation).where(FriendRelation.user == user)).all()
-    return sorted(list(map(lambda x: x.friend, friends)), key=lambda x: x.name)
+    return find_friend_list(session, user).users()
+
+
+def find_friend_list(session: Session, user: User) -> FriendList:
+    friends = friend_cache.get(user.id)
+    if friends is None:
+        statement = (select(User.id, User.name)
+                     .join(FriendRelation, FriendRelation.friend_id == User.id)
+                     .where(FriendRelation.user_id == user.id))
+        friends = friend_cache.put(user.id, session.exec(statement).all())
+    return friends
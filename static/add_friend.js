@@ -19,33 +19,57 @@ function friend_button_builder(friend_id, is_friend) {
 }
 
 $(document).ready(function () {
+    let query = "";
+    let offset = 0;
+
     $("#friend-input").on("keyup", function () {
-        let query = $(this).val();
+        if ($(this).val() === query) {
+            return;
+        }
+        query = $(this).val();
+        offset = 0;
         console.log("query: " + query);
+        $("#result").empty();
         if (query !== "") {
-            $.ajax({
-                url: "/users?query=" + query,
-                type: "GET",
-                dataType: "json"
-            }).done(function (json) {
-                let results = json["result"];
-                let ui = $("#result");
-                ui.empty();
+            search_users();
+        }
+    });
 
-                if (results.length > 0) {
-                    ui.append('<hr class="text-light">');
-                }
+    $("#result").on("click", "#more-button", function () {
+        $(this).remove();
+        search_users();
+    });
 
-                let html = '';
-                results.forEach((result) => {
-                    html += '<div class="m-3 row justify-content-between align-items-center">';
-                    html += '   <p class="p-0 col text-light fs-3 mb-0">' + result.user.name + '</p>';
-                    html += friend_button_builder(result.user.id, result.is_friend)
-                    html += '</div>';
-                    html += '<hr class="text-light">'
-                });
-                ui.append(html);
+    function search_users() {
+        let requested = query;
+        $.ajax({
+            url: "/users?query=" + encodeURIComponent(query) + "&offset=" + offset,
+            type: "GET",
+            dataType: "json"
+        }).done(function (json) {
+            if (requested !== query) {
+                return;
+            }
+            let results = json["result"];
+            let ui = $("#result");
+            offset += results.length;
+
+            if (results.length > 0 && ui.children().length === 0) {
+                ui.append('<hr class="text-light">');
+            }
+
+            let html = '';
+            results.forEach((result) => {
+                html += '<div class="m-3 row justify-content-between align-items-center">';
+                html += '   <p class="p-0 col text-light fs-3 mb-0">' + result.user.name + '</p>';
+                html += friend_button_builder(result.user.id, result.is_friend)
+                html += '</div>';
+                html += '<hr class="text-light">'
             });
-        }
-    });
+            if (json["has_more"]) {
+                html += '<button id="more-button" class="btn btn-outline-light w-100 mb-3">더 보기</button>';
+            }
+            ui.append(html);
+        });
+    }
 });
\ No newline at end of file
@@ -4,45 +4,111 @@ $(document).ready(function () {
     let login_id;
     let chatroom_id;
     let ws;
+    let before;
+    let hasMore = false;
+    let loadingOlder = false;
+    let readTimer;
+    let lastSeq = 0;
+    let seenSeqs = new Set();
+    let reconnectDelay = 500;
+    let pending = [];
 
-    $.ajax({
-        url: window.location + "/chats",
-        type: "get",
-        contentType: "application/json; charset=utf-8",
-    }).done(function (json) {
-        console.log(json);
-        login_id = json["login_user"];
-        chatroom_id = json["chatroom_id"];
-        json["chats"].forEach(chat => {
-            let chat_type = chat["chat_type"];
-            if (chat_type === "text") {
-                addTextChat(login_id, chat);
-            } else if (chat_type === "image") {
-                addImageChat(login_id, chat);
-            } else if (chat_type === "video") {
-                addVideoChat(login_id, chat);
-            }
-        });
-        height = scrollToTop(height);
-        console.log("height: " + height);
+    let ui = $('#chat-list');
+    login_id = ui.data("login-user");
+    chatroom_id = ui.data("chatroom-id");
+    before = ui.data("before");
+    hasMore = ui.data("has-more");
+    lastSeq = ui.data("last-seq");
+    ui.children(".chat").each(function () {
+        seenSeqs.add($(this).data("seq"));
     });
+    height = scrollToTop(height);
+
+    connect();
+
+    function connect() {
+        ws = new WebSocket("ws://localhost:8000/ws/connect?chatroom_id=" + chatroom_id + "&last_seq=" + lastSeq);
+        ws.onopen = function () {
+            reconnectDelay = 500;
+        };
+        ws.onmessage = onMessage;
+        ws.onclose = onClose;
+    }
 
-    ws = new WebSocket("ws://localhost:8000/ws/connect");
-    ws.onmessage = function (event) {
+    function rememberSeq(chat) {
+        if (chat.seq === undefined || chat.seq === null) {
+            return true;
+        }
+        if (seenSeqs.has(chat.seq)) {
+            return false;
+        }
+        seenSeqs.add(chat.seq);
+        lastSeq = Math.max(lastSeq, chat.seq);
+        return true;
+    }
+
+    function onMessage(event) {
         let json = JSON.parse(event.data);
         console.log(json);
+        if (json.error) {
+            alert(json.error);
+            return;
+        }
+        if (json.ack) {
+            return;
+        }
+        if (!rememberSeq(json)) {
+            return;
+        }
+
+        if (pending.length === 0) {
+            requestAnimationFrame(flushPending);
+        }
+        pending.push(json);
+        scheduleRead();
+    }
+
+    function flushPending() {
+        appendChats(login_id, pending);
+        pending = [];
+    }
+
+    function scheduleRead() {
+        clearTimeout(readTimer);
+        readTimer = setTimeout(function () {
+            ws.send(JSON.stringify({action: "read", chatroom_id: chatroom_id}));
+        }, 1000);
+    }
+
+    $('#chat-list').on('scroll', function () {
+        if ($(this).scrollTop() === 0 && hasMore && !loadingOlder) {
+            loadOlderChats();
+        }
+    });
+
+    function loadOlderChats() {
+        loadingOlder = true;
+        $.ajax({
+            url: window.location + "/chats?before=" + encodeURIComponent(before),
+            type: "get",
+            contentType: "application/json; charset=utf-8",
+        }).done(function (json) {
+            before = json["before"];
+            hasMore = json["has_more"];
+            prependChats(login_id, json["chats"]);
+        }).always(function () {
+            loadingOlder = false;
+        });
+    }
 
-        let chat_type = json["chat_type"];
-        if (chat_type === "text") {
-            addTextChat(login_id, json);
-        } else if (chat_type === "image") {
-            addImageChat(login_id, json);
-        } else if (chat_type === "video") {
-            addVideoChat(login_id, json);
+    function onClose(event) {
+        if (event.code === 1013) {
+            window.location.reload();
+            return;
         }
-        height = scrollToTop(height);
-        console.log("height: " + height);
-    };
+        setTimeout(connect, reconnectDelay * (0.5 + Math.random()));
+        reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+    }
 
     $('#input-text').on('keydown', function (event) {
         if (event.keyCode === 13) {
@@ -72,7 +138,9 @@ $(document).ready(function () {
             data: data
         }).done(function (json) {
             console.log(json)
-            sendImage(json["id"])
+            sendImage(json["id"], json["name"])
+        }).fail(function (xhr) {
+            alert(xhr.responseJSON ? xhr.responseJSON["error"] : "파일을 업로드할 수 없습니다.");
         });
     })
 
@@ -91,11 +159,12 @@ $(document).ready(function () {
         ws.send(data);
     }
 
-    function sendImage(imageId) {
+    function sendImage(imageId, name) {
         let data = JSON.stringify({
             writer_id: login_id,
             chatroom_id: chatroom_id,
             image_id: imageId,
+            name: name,
             chat_type: "image"
         });
         console.log(data);
@@ -103,14 +172,16 @@ $(document).ready(function () {
     }
 });
 
-function addTextChat(login_id, chat) {
-    addTextChatUI(login_id, chat);
-    clearText($('#input-text'));
+function appendChats(login_id, chats) {
+    $('#chat-list').append(chats.map(chat => chatHtml(login_id, chat, true)).join(""));
+    if (chats.some(chat => chat.chat_type === "text" && getUserTag(login_id, chat) === "me")) {
+        clearText($('#input-text'));
+    }
+    height = scrollToTop(height);
 }
 
-function addTextChatUI(login_id, chat) {
-    let ui = $('#chat-list');
-    ui.append(`
+function textChatHtml(login_id, chat) {
+    return `
         <div class="chat ${getUserTag(login_id, chat)}">
             <div class="chat-writer text-light">${chat.writer.name}</div>
             <div class="chat-row">
@@ -118,50 +189,65 @@ function addTextChatUI(login_id, chat) {
                 <div class="chat-time text-light">${parseTime(chat.time)}</div>
             </div>
         </div>
-    `);
+    `;
 }
 
 
-function addImageChat(login_id, chat) {
-    addImageChatUI(login_id, chat);
-}
-
-function addImageChatUI(login_id, chat) {
-    let ui = $('#chat-list');
+function imageChatHtml(login_id, chat, autoScroll) {
     let width = window.innerWidth;
-    ui.append(`
+    return `
         <div class="chat ${getUserTag(login_id, chat)}">
             <div class="chat-writer text-light">${chat.writer.name}</div>
             <div class="chat-row">
-                <div class="chat-image"><img src="http://localhost:8000/images/${chat["image"]["image_name"]}" 
-                width="${width / 100 * 60}" height="auto" onload="scrollToTop()"
+                <div class="chat-image"><img src="http://localhost:8000/images/${previewName(chat)}" 
+                width="${width / 100 * 60}" height="auto" loading="lazy" ${autoScroll ? 'onload="scrollToTop()"' : ''}
                 onclick="window.open('http://localhost:8000/images/${chat["image"]["image_name"]}')" ></div>
                 <div class="chat-time text-light">${parseTime(chat.time)}</div>
             </div>
         </div>
-    `)
-}
-
-function addVideoChat(login_id, chat) {
-    addVideoChatUI(login_id, chat);
+    `;
 }
 
-function addVideoChatUI(login_id, chat) {
-    let ui = $('#chat-list');
+function videoChatHtml(login_id, chat, autoScroll) {
     let width = window.innerWidth;
-    ui.append(`
+    return `
         <div class="chat ${getUserTag(login_id, chat)}">
             <div class="chat-writer text-light">${chat.writer.name}</div>
             <div class="chat-row">
                 <div class="chat-video">
                     <video class="video" src="http://localhost:8000/images/${chat["image"]["image_name"]}" 
-                    width="${width / 100 * 60}" height="auto" muted autoplay controls onload="scrollToTop()" 
+                    ${chat["image"]["thumbnail_name"] ? `poster="http://localhost:8000/images/${chat["image"]["thumbnail_name"]}"` : ''}
+                    width="${width / 100 * 60}" height="auto" muted preload="none" controls ${autoScroll ? 'onload="scrollToTop()"' : ''}
                     onclick="window.open('http://localhost:8000/images/${chat["image"]["image_name"]}')" ></video>
                 </div>
                 <div class="chat-time text-light">${parseTime(chat.time)}</div>
             </div>
         </div>
-    `);
+    `;
+}
+
+function previewName(chat) {
+    return chat["image"]["thumbnail_name"] || chat["image"]["image_name"];
+}
+
+function chatHtml(login_id, chat, autoScroll) {
+    let chat_type = chat["chat_type"];
+    if (chat_type === "text") {
+        return textChatHtml(login_id, chat);
+    } else if (chat_type === "image") {
+        return imageChatHtml(login_id, chat, autoScroll);
+    } else if (chat_type === "video") {
+        return videoChatHtml(login_id, chat, autoScroll);
+    }
+    return "";
+}
+
+function prependChats(login_id, chats) {
+    let ui = $('#chat-list');
+    let oldHeight = ui[0].scrollHeight;
+    ui.prepend(chats.map(chat => chatHtml(login_id, chat, false)).join(""));
+    height = ui[0].scrollHeight;
+    ui.scrollTop(height - oldHeight);
 }
 
 function convertToHtml(text) {
@@ -169,7 +255,7 @@ function convertToHtml(text) {
 }
 
 function getUserTag(login_id, chat) {
-    return chat.writer_id === login_id ? "me" : "other";
+    return chat.writer.id === login_id ? "me" : "other";
 }
 
 function clearText(ui) {
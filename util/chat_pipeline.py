@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class ChatPipeline:
+    def __init__(self, write_batch, publish, max_batch_size: int = 100, max_delay: float = 0.005,
+                 max_queue_size: int = 10000):
+        self.write_batch = write_batch
+        self.publish = publish
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_queue_size = max_queue_size
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.messages = 0
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+    async def submit(self, data) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((data, future))
+        return future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                chats = await run_in_threadpool(self.write_batch, [data for data, _ in batch])
+            except Exception:
+                logger.exception("채팅 저장 실패: batch=%d", len(batch))
+                for _, future in batch:
+                    future.set_result(None)
+                continue
+
+            self.batches += 1
+            self.messages += sum(chat is not None for chat in chats)
+            for (_, future), chat in zip(batch, chats):
+                if chat is not None:
+                    try:
+                        await self.publish(chat["chatroom_id"], chat)
+                    except Exception:
+                        logger.exception("채팅 전송 실패: chatroom_id=%s", chat["chatroom_id"])
+                future.set_result(chat)
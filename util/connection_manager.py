@@ -1,23 +1,272 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
 from fastapi import WebSocket
+from starlette.websockets import WebSocketDisconnect
+
+from util.message_bus import InProcessBus
+from util.metrics import websocket_send_latency
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+RESYNC_CLOSE_CODE = 1013
+MSGPACK_SUBPROTOCOL = "chat.msgpack"
+
+logger = logging.getLogger(__name__)
+
+
+def encode(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def negotiate(ws: WebSocket):
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in ws.scope.get("subprotocols", []):
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+class RoomHistory:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = deque()
+        self.floor = None
+
+    def append(self, seq: int, message: str):
+        if self.floor is None and not self.entries:
+            self.floor = seq - 1
+        if seq <= self.floor:
+            return
+        position = len(self.entries)
+        while position > 0 and self.entries[position - 1][0] >= seq:
+            if self.entries[position - 1][0] == seq:
+                return
+            position -= 1
+        self.entries.insert(position, (seq, message))
+        self._trim()
+
+    def since(self, last_seq: int):
+        if self.floor is None or last_seq < self.floor:
+            return None
+        return [message for seq, message in self.entries if seq > last_seq]
+
+    def seed(self, last_seq: int, rows: list):
+        newest = rows[-1][0] if rows else last_seq
+        merged = rows + [entry for entry in self.entries if entry[0] > newest]
+        floor = rows[0][0] - 1 if rows else None
+        if floor is not None and (self.floor is None or floor < self.floor):
+            self.entries = deque(merged)
+            self.floor = floor
+            self._trim()
+        return [message for _, message in merged]
+
+    def _trim(self):
+        while len(self.entries) > self.max_size:
+            self.floor = self.entries.popleft()[0]
+
+
+class Connection:
+    def __init__(self, ws: WebSocket, max_queue_size: int, binary: bool = False):
+        self.ws = ws
+        self.binary = binary
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.chatroom_ids = set()
+        self.writer = None
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = []
+    def __init__(self, max_queue_size: int = 256, history_size: int = 256, history_rooms: int = 1000):
+        self.max_queue_size = max_queue_size
+        self.history_size = history_size
+        self.history_rooms = history_rooms
+        self.connections = {}
+        self.rooms = {}
+        self.histories = OrderedDict()
+        self.loading = {}
+        self.resumed_from_memory = 0
+        self.resumed_from_database = 0
+        self.opened_connections = 0
+        self.received_messages = 0
+        self.sent_messages = 0
+        self.evicted_connections = 0
+        self.bus = InProcessBus(self.deliver)
+
+    async def start(self, bus):
+        await self.bus.close()
+        self.bus = bus
+        await bus.start(self.deliver)
+
+    async def stop(self):
+        await self.bus.close()
 
     async def connect(self, ws: WebSocket):
-        await ws.accept()
-        self.active_connections.append(ws)
-        print("Connect new websocket", len(self.active_connections))
+        subprotocol = negotiate(ws)
+        await ws.accept(subprotocol=subprotocol)
+        connection = Connection(ws, self.max_queue_size, binary=subprotocol == MSGPACK_SUBPROTOCOL)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[ws] = connection
+        self.opened_connections += 1
+        logger.debug("웹소켓 연결: connections=%d", len(self.connections))
 
     async def disconnect(self, ws: WebSocket):
-        self.active_connections.remove(ws)
-        print("Connection removed", len(self.active_connections))
+        connection = self._remove(ws)
+        if connection is None:
+            return
+        connection.writer.cancel()
+        logger.debug("웹소켓 연결 해제: connections=%d", len(self.connections))
+
+    def subscribe(self, ws: WebSocket, chatroom_id: int):
+        connection = self.connections.get(ws)
+        if connection is None:
+            return
+        self.rooms.setdefault(chatroom_id, set()).add(connection)
+        connection.chatroom_ids.add(chatroom_id)
+
+    async def resume(self, ws: WebSocket, chatroom_id: int, last_seq: int, load):
+        messages = self._history(chatroom_id).since(last_seq)
+        while messages is None and chatroom_id in self.loading:
+            await self.loading[chatroom_id].wait()
+            messages = self._history(chatroom_id).since(last_seq)
+
+        if messages is None:
+            self.loading[chatroom_id] = loaded = asyncio.Event()
+            try:
+                rows, has_more = await load(chatroom_id, last_seq)
+            finally:
+                del self.loading[chatroom_id]
+                loaded.set()
+            if not has_more:
+                messages = self._history(chatroom_id).seed(last_seq, rows)
+            self.resumed_from_database += 1
+        else:
+            self.resumed_from_memory += 1
+
+        connection = self.connections.get(ws)
+        if connection is None:
+            return False
+        if messages is None:
+            self._evict(connection)
+            return False
+        self.subscribe(ws, chatroom_id)
+        enqueued_at = time.perf_counter()
+        for message in messages:
+            if connection.binary:
+                message = msgpack.packb(json.loads(message))
+            try:
+                connection.queue.put_nowait((message, enqueued_at))
+            except asyncio.QueueFull:
+                self._evict(connection)
+                return False
+        return True
+
+    def _history(self, chatroom_id: int) -> RoomHistory:
+        history = self.histories.get(chatroom_id)
+        if history is None:
+            history = self.histories[chatroom_id] = RoomHistory(self.history_size)
+            while len(self.histories) > self.history_rooms:
+                self.histories.popitem(last=False)
+        self.histories.move_to_end(chatroom_id)
+        return history
+
+    def unsubscribe(self, ws: WebSocket, chatroom_id: int):
+        connection = self.connections.get(ws)
+        if connection is None:
+            return
+        self._leave(connection, chatroom_id)
+        connection.chatroom_ids.discard(chatroom_id)
+
+    def _leave(self, connection: Connection, chatroom_id: int):
+        members = self.rooms.get(chatroom_id)
+        if members is None:
+            return
+        members.discard(connection)
+        if not members:
+            del self.rooms[chatroom_id]
+
+    def _remove(self, ws: WebSocket):
+        connection = self.connections.pop(ws, None)
+        if connection is None:
+            return None
+        for chatroom_id in connection.chatroom_ids:
+            self._leave(connection, chatroom_id)
+        return connection
+
+    async def broadcast(self, chatroom_id: int, data):
+        logger.debug("채팅 전송: %s", data)
+        await self.bus.publish(chatroom_id, encode(data))
+
+    async def receive(self, ws: WebSocket):
+        message = await ws.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        self.received_messages += 1
+        if message.get("bytes") is not None:
+            return msgpack.unpackb(message["bytes"])
+        return json.loads(message["text"])
+
+    def send(self, ws: WebSocket, data):
+        connection = self.connections.get(ws)
+        if connection is None:
+            return
+        frame = msgpack.packb(data) if connection.binary else encode(data)
+        try:
+            connection.queue.put_nowait((frame, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._evict(connection)
+
+    def deliver(self, chatroom_id: int, message: str):
+        data = json.loads(message)
+        if data.get("seq") is not None:
+            self._history(chatroom_id).append(data["seq"], message)
+        packed = None
+        enqueued_at = time.perf_counter()
+        for connection in list(self.rooms.get(chatroom_id, ())):
+            frame = message
+            if connection.binary:
+                packed = packed or msgpack.packb(data)
+                frame = packed
+            try:
+                connection.queue.put_nowait((frame, enqueued_at))
+            except asyncio.QueueFull:
+                self._evict(connection)
+
+    def _evict(self, connection: Connection):
+        if self._remove(connection.ws) is None:
+            return
+        self.evicted_connections += 1
+        logger.warning("웹소켓 재동기화 필요, 연결 종료: connections=%d", len(self.connections))
+        connection.writer.cancel()
+        asyncio.create_task(self._close(connection.ws, RESYNC_CLOSE_CODE))
+
+    @staticmethod
+    async def _close(ws: WebSocket, code: int):
+        try:
+            await ws.close(code=code)
+        except Exception:
+            pass
+
+    async def _write(self, connection: Connection):
+        while True:
+            message, enqueued_at = await connection.queue.get()
+            try:
+                if connection.binary:
+                    await connection.ws.send_bytes(message)
+                else:
+                    await connection.ws.send_text(message)
+            except Exception as e:
+                logger.info("웹소켓 전송 실패: %s", e)
+                self._evict(connection)
+                return
 
-    async def broadcast(self, data):
-        print(f'{data=}')
-        for connection in self.active_connections:
-            await connection.send_json(data)
+            self.sent_messages += 1
+            websocket_send_latency.observe(time.perf_counter() - enqueued_at)
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(history_size=int(os.environ.get("RESYNC_BUFFER_SIZE", 256)),
+                            history_rooms=int(os.environ.get("RESYNC_BUFFER_ROOMS", 1000)))
@@ -0,0 +1,36 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "mmap_size": str(256 * 1024 * 1024),
+    "cache_size": str(-64 * 1024),
+}
+
+
+def create_database_engine(url: str | None = None, **pragmas) -> Engine:
+    url = url or os.environ.get("DATABASE_URL", "sqlite:///database.db")
+    if not url.startswith("sqlite:///") or ":memory:" in url:
+        return create_engine(url)
+
+    engine = create_engine(url,
+                           pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+                           max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+                           pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                           connect_args={"check_same_thread": False})
+    settings = {name: os.environ.get(f"SQLITE_{name.upper()}", value) for name, value in SQLITE_PRAGMAS.items()}
+    settings.update(pragmas)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
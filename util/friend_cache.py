@@ -0,0 +1,42 @@
+import bisect
+import os
+
+from util.ttl_cache import TTLCache
+
+
+class FriendList:
+    def __init__(self, friends):
+        self.keys = sorted((name, friend_id) for friend_id, name in friends)
+        self.names = {friend_id: name for name, friend_id in self.keys}
+
+    def add(self, friend_id: int, name: str):
+        if friend_id in self.names:
+            return
+        keys = list(self.keys)
+        bisect.insort(keys, (name, friend_id))
+        self.keys = keys
+        self.names[friend_id] = name
+
+    def users(self) -> list:
+        return [{"id": friend_id, "name": name} for name, friend_id in self.keys]
+
+    def __contains__(self, friend_id) -> bool:
+        return friend_id in self.names
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class FriendCache(TTLCache):
+    def put(self, user_id: int, friends) -> FriendList:
+        return super().put(user_id, FriendList(friends))
+
+    def add(self, user_id: int, friend_id: int, name: str):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                entry[0].add(friend_id, name)
+
+
+friend_cache = FriendCache(max_size=int(os.environ.get("FRIEND_CACHE_SIZE", 10000)),
+                           ttl=float(os.environ.get("FRIEND_CACHE_TTL", 300)))
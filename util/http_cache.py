@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response, FileResponse, StreamingResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+CHUNK_SIZE = 64 * 1024
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".html")
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+FINGERPRINT = re.compile(r"^(?P<name>.+)\.[0-9a-f]{12}(?P<ext>\.[^./]+)$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def parse_range(header: str, size: int):
+    match = RANGE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+async def iter_file(path: str, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as fp:
+        await fp.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await fp.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def media_response(request: Request, path: str) -> Response:
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    except FileNotFoundError:
+        return Response(status_code=404)
+    if not stat.S_ISREG(stat_result.st_mode):
+        return Response(status_code=404)
+
+    size = stat_result.st_size
+    etag = f'"{os.path.splitext(os.path.basename(path))[0]}"'
+    headers = {"etag": etag, "cache-control": IMMUTABLE, "accept-ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            return StreamingResponse(iter_file(path, start, end), status_code=206,
+                                     media_type=mimetypes.guess_type(path)[0],
+                                     headers={**headers, "content-range": f"bytes {start}-{end}/{size}",
+                                              "content-length": str(end - start + 1)})
+
+    return FileResponse(path, stat_result=stat_result, headers=headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fingerprints = {}
+
+    def url(self, path: str) -> str:
+        full_path = os.path.join(self.directory, path)
+        mtime = os.stat(full_path).st_mtime
+        cached = self.fingerprints.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(full_path, "rb") as fp:
+                cached = (mtime, hashlib.sha256(fp.read()).hexdigest()[:12])
+            self.fingerprints[path] = cached
+        fingerprint = cached[1]
+        name, ext = os.path.splitext(path)
+        return f"/static/{name}.{fingerprint}{ext}"
+
+    async def get_response(self, path: str, scope) -> Response:
+        match = FINGERPRINT.match(path)
+        if match:
+            path = match["name"] + match["ext"]
+        response = await super().get_response(path, scope)
+        current = False
+        if match and response.status_code in (200, 304):
+            current = await anyio.to_thread.run_sync(self.url, path) == "/static/" + match.string
+        response.headers["cache-control"] = IMMUTABLE if current else REVALIDATE
+        return response
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        if full_path.endswith(COMPRESSIBLE):
+            accepted = request_headers.get("accept-encoding", "")
+            for encoding, suffix in ENCODINGS.items():
+                if encoding not in accepted:
+                    continue
+                try:
+                    compressed_stat = os.stat(full_path + suffix)
+                except FileNotFoundError:
+                    continue
+                if compressed_stat.st_mtime < stat_result.st_mtime:
+                    continue
+                response = FileResponse(full_path + suffix, status_code=status_code, stat_result=compressed_stat,
+                                        method=scope["method"], media_type=mimetypes.guess_type(full_path)[0],
+                                        headers={"content-encoding": encoding, "vary": "Accept-Encoding"})
+                if self.is_not_modified(response.headers, request_headers):
+                    return Response(status_code=304, headers=response.headers)
+                return response
+
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if full_path.endswith(COMPRESSIBLE):
+            response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def compress_static(directory: str, exclude: tuple = ("image",)) -> int:
+    compressors = {".gz": lambda content: gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        compressors[".br"] = brotli.compress
+
+    compressed = 0
+    for root, dirs, names in os.walk(directory):
+        if root == directory:
+            dirs[:] = [name for name in dirs if name not in exclude]
+        for name in names:
+            path = os.path.join(root, name)
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            mtime = os.stat(path).st_mtime
+            stale = [suffix for suffix in compressors if not is_fresh(path + suffix, mtime)]
+            if not stale:
+                continue
+            with open(path, "rb") as fp:
+                content = fp.read()
+            for suffix in stale:
+                with open(path + suffix, "wb") as fp:
+                    fp.write(compressors[suffix](content))
+            compressed += len(stale)
+    return compressed
+
+
+def is_fresh(path: str, mtime: float) -> bool:
+    try:
+        return os.stat(path).st_mtime >= mtime
+    except FileNotFoundError:
+        return False
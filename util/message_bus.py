@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBus:
+    def __init__(self, handler=None):
+        self.handler = handler
+
+    async def start(self, handler):
+        self.handler = handler
+
+    async def publish(self, chatroom_id: int, message: str):
+        self.handler(chatroom_id, message)
+
+    async def close(self):
+        pass
+
+
+# 브로커는 "<chatroom_id> <json>\n" 프레임을 발행한 워커를 포함한 모든 워커에게 전달한다.
+class SocketBus:
+    def __init__(self, host: str, port: int, retry_interval: float = 1.0):
+        self.host = host
+        self.port = port
+        self.retry_interval = retry_interval
+        self.handler = None
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+
+    async def start(self, handler):
+        self.handler = handler
+        await self._connect()
+        self.reader_task = asyncio.create_task(self._read())
+
+    async def _connect(self):
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.reader = reader
+
+    async def publish(self, chatroom_id: int, message: str):
+        if self.writer is None or self.writer.is_closing():
+            logger.warning("메시지 브로커에 연결되어 있지 않습니다. 로컬로만 전달합니다.")
+            self.handler(chatroom_id, message)
+            return
+        self.writer.write(f"{chatroom_id} {message}\n".encode())
+        await self.writer.drain()
+
+    async def _read(self):
+        while True:
+            try:
+                line = await self.reader.readline()
+                if not line:
+                    raise ConnectionError("message broker closed the connection")
+                chatroom_id, message = line.decode().rstrip("\n").split(" ", 1)
+                self.handler(int(chatroom_id), message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("메시지 브로커 연결 끊김: %s", e)
+                self.writer = None
+                await self._reconnect()
+
+    async def _reconnect(self):
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self._connect()
+                return
+            except OSError as e:
+                logger.info("메시지 브로커 재연결 실패: %s", e)
+
+    async def close(self):
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.writer:
+            self.writer.close()
+
+
+class MessageBroker:
+    def __init__(self):
+        self.writers = set()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writers.add(writer)
+        try:
+            while line := await reader.readline():
+                for w in list(self.writers):
+                    w.write(line)
+        except ConnectionError as e:
+            logger.info("워커 연결 끊김: %s", e)
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info("메시지 브로커 시작: %s:%d", host, port)
+        return server
+
+
+def create_bus(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return InProcessBus()
+    if parsed.scheme == "tcp":
+        return SocketBus(parsed.hostname, parsed.port)
+    raise ValueError(f'지원하지 않는 메시지 버스입니다. URL: {url}')
+
+
+async def run_broker(host: str, port: int):
+    server = await MessageBroker().serve(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat message broker for multi-worker deployments")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(run_broker(args.host, args.port))
@@ -0,0 +1,184 @@
+import bisect
+import os
+import time
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, value: float, *label_values):
+        with self.lock:
+            counts, total = self.values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[label_values] = (counts, total + value)
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    labels = format_labels(self.labels + ("le",), label_values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    def __init__(self, name: str, documentation: str, kind: str, function):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.function = function
+
+    def collect(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {self.function()}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name: str, documentation: str, function) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "gauge", function))
+
+    def callback_counter(self, name: str, documentation: str, function) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, "counter", function))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+registry = Registry()
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status.",
+                                 ("method", "route", "status"))
+http_request_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                           ("method", "route"))
+http_request_queries = registry.histogram("http_request_db_queries", "Database queries per HTTP request.",
+                                          ("method", "route"), QUERY_COUNT_BUCKETS)
+http_request_query_time = registry.histogram("http_request_db_seconds", "Database time per HTTP request.",
+                                             ("method", "route"))
+db_queries = registry.counter("db_queries_total", "Database statements executed.")
+db_query_duration = registry.histogram("db_query_duration_seconds", "Database statement latency.")
+db_query_errors = registry.counter("db_query_errors_total", "Database statements that raised an error.")
+websocket_send_latency = registry.histogram("websocket_send_latency_seconds",
+                                            "Time WebSocket messages wait in the send queue until sent.")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - conn.info["query_start"].pop())
+
+
+def handle_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if not starts:
+        return
+    db_query_errors.inc()
+    record_query(time.perf_counter() - starts.pop())
+
+
+def record_query(elapsed: float):
+    db_queries.inc()
+    db_query_duration.observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+
+
+def instrument_engines():
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(Engine, "handle_error", handle_error)
+
+
+def observe_request(method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+    http_requests.inc(method, route, status)
+    http_request_duration.observe(elapsed, method, route)
+    http_request_queries.observe(stats.queries, method, route)
+    http_request_query_time.observe(stats.query_time, method, route)
+
+
+def is_profiling_enabled() -> bool:
+    return os.environ.get("PROFILING_ENABLED", "false").lower() == "true" and Profiler is not None
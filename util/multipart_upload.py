@@ -0,0 +1,83 @@
+try:
+    import python_multipart as multipart
+except ImportError:
+    import multipart
+
+from starlette.requests import Request
+
+from util.user_exceptions import InvalidUploadException, UploadTooLargeException
+
+MAX_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class MultipartUpload:
+    def __init__(self, request: Request, max_size: int, field_name: str = "file"):
+        self.request = request
+        self.max_size = max_size
+        self.field_name = field_name
+        self.filename = None
+        self.content_type = None
+        self.header_name = b""
+        self.header_value = b""
+        self.headers = {}
+        self.reading = False
+        self.done = False
+        self.chunks = []
+
+    async def stream(self):
+        content_length = self.request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_size + MAX_MULTIPART_OVERHEAD:
+            raise UploadTooLargeException(None, self.max_size)
+
+        _, params = multipart.multipart.parse_options_header(self.request.headers.get("content-type", ""))
+        if b"boundary" not in params:
+            raise InvalidUploadException()
+
+        parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        })
+        async for body in self.request.stream():
+            parser.write(body)
+            chunks, self.chunks = self.chunks, []
+            for chunk in chunks:
+                yield chunk
+        parser.finalize()
+        if not self.done:
+            raise InvalidUploadException()
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_name.lower()] = self.header_value
+        self.header_name = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = multipart.multipart.parse_options_header(self.headers.get(b"content-disposition", b""))
+        if self.done or options.get(b"name", b"").decode() != self.field_name or b"filename" not in options:
+            return
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = self.headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+        self.reading = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.reading:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        if self.reading:
+            self.reading = False
+            self.done = True
@@ -0,0 +1,6 @@
+import os
+
+from util.ttl_cache import TTLCache
+
+session_cache = TTLCache(max_size=int(os.environ.get("SESSION_CACHE_SIZE", 10000)),
+                         ttl=float(os.environ.get("SESSION_CACHE_TTL", 60)))
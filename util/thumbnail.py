@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:
+    PILImage = None
+
+THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", 480))
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", 2))
+FFMPEG = shutil.which("ffmpeg")
+
+logger = logging.getLogger(__name__)
+
+
+def is_supported(image_type: str) -> bool:
+    if image_type == "image":
+        return PILImage is not None
+    if image_type == "video":
+        return FFMPEG is not None
+    return False
+
+
+def resize_image(source: str, target: str, size: int):
+    with PILImage.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        image.convert("RGB").save(target, "JPEG", quality=80, optimize=True)
+
+
+def extract_poster(source: str, target: str, size: int):
+    subprocess.run([FFMPEG, "-loglevel", "error", "-y", "-i", source, "-frames:v", "1",
+                    "-vf", f"scale='min({size},iw)':-2", target],
+                   check=True, timeout=30)
+
+
+def make_thumbnail(source: str, target: str, image_type: str, size: int):
+    if image_type == "video":
+        extract_poster(source, target, size)
+    else:
+        resize_image(source, target, size)
+
+
+class ThumbnailGenerator:
+    def __init__(self, max_workers: int = 2, size: int = 480):
+        self.max_workers = max_workers
+        self.size = size
+        self.executor = None
+        self.pending = set()
+
+    async def create(self, source: str, target: str, image_type: str) -> bool:
+        if not is_supported(image_type) or target in self.pending:
+            return False
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        self.pending.add(target)
+        try:
+            await loop.run_in_executor(executor, make_thumbnail, source, target, image_type, self.size)
+        except Exception as e:
+            logger.warning("썸네일 생성 실패: %s %s", source, e)
+            if isinstance(e, BrokenProcessPool) and self.executor is executor:
+                self.executor = None
+                executor.shutdown(wait=False)
+            if os.path.exists(target):
+                os.remove(target)
+            return False
+        finally:
+            self.pending.discard(target)
+        return True
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+thumbnail_generator = ThumbnailGenerator(max_workers=THUMBNAIL_WORKERS, size=THUMBNAIL_SIZE)
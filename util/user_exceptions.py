@@ -19,4 +19,30 @@ class LoginException(Exception):
 class SessionNotFoundException(Exception):
     def __init__(self, session_id):
         super().__init__(f'세션 ID에 해당하는 유저가 존재하지 않습니다. 세션 ID: {session_id}')
-        
\ No newline at end of file
+
+
+class InvalidCursorException(Exception):
+    def __init__(self, cursor):
+        super().__init__(f'잘못된 커서입니다. 커서: {cursor}')
+
+    @staticmethod
+    def description():
+        return "잘못된 커서입니다."
+
+
+class UploadTooLargeException(Exception):
+    def __init__(self, filename, max_size):
+        super().__init__(f'업로드 가능한 파일 크기를 초과했습니다. 파일: {filename}, 최대 크기: {max_size}')
+        self.max_size = max_size
+
+    def description(self):
+        return f"{self.max_size // (1024 * 1024)}MB 이하의 파일만 업로드할 수 있습니다."
+
+
+class InvalidUploadException(Exception):
+    def __init__(self):
+        super().__init__('업로드할 파일을 찾을 수 없습니다.')
+
+    @staticmethod
+    def description():
+        return "업로드할 파일이 없습니다."